@@ -0,0 +1,94 @@
+"""
+Measure API client throughput against an in-process fake Snek site.
+
+Run with `python -m benchmarks.api_throughput --help`.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import typing as t
+
+from aiohttp import web
+
+from benchmarks.fake_site import add_arguments, FakeSite, options_from_args
+from snek.api import APIClient, ResponseCodeError
+
+
+async def timed(name: str, coro: t.Awaitable, amount: int) -> None:
+    started = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - started
+
+    print(f'{name:<24} {elapsed:8.3f}s  {amount / elapsed:10,.0f} records/s')
+
+
+async def main(args: argparse.Namespace) -> None:
+    site = FakeSite(options_from_args(args))
+    runner = web.AppRunner(site.create_app(), access_log=None)
+    await runner.setup()
+
+    if args.unix:
+        socket_path = os.path.join(tempfile.mkdtemp(), 'snek-site.sock')
+        await web.UnixSite(runner, socket_path).start()
+        os.environ['SNEK_SITE_URL'] = f'unix://{socket_path}'
+    else:
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        os.environ['SNEK_SITE_URL'] = f'http://127.0.0.1:{runner.addresses[0][1]}'
+    os.environ.setdefault('SNEK_API_TOKEN', 'benchmark')
+    if args.compress:
+        os.environ['SNEK_API_COMPRESS_REQUESTS'] = 'true'
+
+    client = APIClient(loop=asyncio.get_event_loop())
+    await client.ready.wait()
+
+    users = list()
+    # Separate IDs for lookups one by one and in batches, so neither is served from the other's cached responses
+    user_ids = list(site.data['users'])[:args.requests]
+    load_ids = list(site.data['users'])[args.requests:args.requests * 2]
+
+    async def list_users() -> None:
+        async for page in client.iter_pages('users'):
+            users.extend(page)
+
+    async def get_users() -> None:
+        async def get_user(user_id: int) -> None:
+            try:
+                await client.get(f'users/{user_id}')
+            except ResponseCodeError:
+                pass
+
+        await asyncio.gather(*(get_user(user_id) for user_id in user_ids))
+
+    async def load_users() -> None:
+        await asyncio.gather(*(client.load('users', user_id) for user_id in load_ids))
+
+    async def put_users() -> None:
+        result = await client.bulk('PUT', 'users', users)
+        if result.failed:
+            print(f'{len(result.failed)} users failed to update')
+
+    try:
+        await timed('list users', list_users(), len(site.data['users']))
+        await timed('get users one by one', get_users(), len(user_ids))
+        await timed('load users in batches', load_users(), len(load_ids))
+        await timed('bulk PUT users', put_users(), len(users))
+
+        print(f'\n{site.requests} requests served\n')
+        print('\n'.join(client.metrics.summary()))
+        print(client.compressor.summary())
+
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure API client throughput against a fake Snek site.')
+    parser.add_argument('--requests', type=int, default=2000, help='amount of single user GETs')
+    parser.add_argument('--unix', action='store_true', help='connect over a Unix domain socket instead of TCP')
+    parser.add_argument('--compress', action='store_true', help='gzip large request bodies')
+    add_arguments(parser)
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+"""
+Compare the JSON codecs of the API client on realistic `users` payloads.
+
+Run with `python -m benchmarks.codec [users] [repeat]`.
+"""
+import random
+import sys
+import timeit
+import typing as t
+
+from snek.api.codec import JSONCodec, orjson, OrjsonCodec
+
+SNOWFLAKE_MIN = 80_000_000_000_000_000
+SNOWFLAKE_MAX = 800_000_000_000_000_000
+
+
+def make_users(amount: int, guilds: int = 40, roles_per_guild: int = 25) -> t.List[t.Dict]:
+    """Create `amount` user records shaped like those sent and received by the user syncer."""
+    rng = random.Random(0)
+
+    guild_ids = [rng.randrange(SNOWFLAKE_MIN, SNOWFLAKE_MAX) for _ in range(guilds)]
+    role_ids = {
+        guild: [rng.randrange(SNOWFLAKE_MIN, SNOWFLAKE_MAX) for _ in range(roles_per_guild)]
+        for guild in guild_ids
+    }
+
+    users = list()
+    for _ in range(amount):
+        user_id = rng.randrange(SNOWFLAKE_MIN, SNOWFLAKE_MAX)
+        user_guilds = rng.sample(guild_ids, rng.randint(1, 4))
+
+        users.append({
+            'id': user_id,
+            'name': ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz_') for _ in range(rng.randint(3, 20))),
+            'discriminator': f'{rng.randint(1, 9999):04}',
+            'created_at': '2019-06-14 11:32:07.618000',
+            'avatar_url': f'https://cdn.discordapp.com/avatars/{user_id}/{rng.getrandbits(128):032x}.webp?size=1024',
+            'roles': sorted(role for guild in user_guilds for role in rng.sample(role_ids[guild], rng.randint(1, 5))),
+            'guilds': user_guilds
+        })
+
+    return users
+
+
+def main(amount: int = 50_000, repeat: int = 5) -> None:
+    users = make_users(amount)
+    codecs = [JSONCodec()]
+
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    else:
+        print('orjson is not installed, only benchmarking the standard library.')
+
+    body = codecs[0].dumps(users)
+    print(f'{amount:,} users, {len(body) / 1024 / 1024:.1f} MiB encoded\n')
+    print(f'{"codec":<8} {"encode":>10} {"decode":>10} {"encode/user":>14} {"decode/user":>14}')
+
+    for codec in codecs:
+        encode = min(timeit.repeat(lambda: codec.dumps(users), number=1, repeat=repeat))
+        decode = min(timeit.repeat(lambda: codec.loads(body), number=1, repeat=repeat))
+
+        print(
+            f'{codec.name:<8} {encode * 1000:>8.1f}ms {decode * 1000:>8.1f}ms '
+            f'{encode / amount * 1e6:>12.2f}us {decode / amount * 1e6:>12.2f}us'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
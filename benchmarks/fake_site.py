@@ -0,0 +1,325 @@
+"""
+An in-memory stand-in for the Snek site's API, for load testing the API client and syncers offline.
+
+Run with `python -m benchmarks.fake_site --help` and point `SNEK_SITE_URL` at it, e.g.
+`http://127.0.0.1:8000`, or `unix:///tmp/snek-site.sock` when serving on a Unix socket.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import typing as t
+
+from aiohttp import web
+
+from benchmarks.codec import SNOWFLAKE_MAX, SNOWFLAKE_MIN
+
+FAMILIES = ('guilds', 'roles', 'users', 'guild_configs')
+
+
+class FakeSiteOptions(t.NamedTuple):
+    guilds: int = 50
+    roles_per_guild: int = 20
+    users: int = 10_000
+    latency: float = 0.0
+    jitter: float = 0.0
+    slow_rate: float = 0.0
+    slow_latency: float = 500.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    paginate: bool = False
+    bulk: bool = True
+    in_filters: bool = True
+    upsert: bool = False
+    gzip_requests: bool = True
+    compress_responses: bool = True
+    seed: int = 0
+
+
+def make_dataset(options: FakeSiteOptions) -> t.Dict[str, t.Dict[int, t.Dict]]:
+    """Create guilds, roles, users and guild configs that reference each other consistently."""
+    rng = random.Random(options.seed)
+
+    def snowflake() -> int:
+        return rng.randrange(SNOWFLAKE_MIN, SNOWFLAKE_MAX)
+
+    data = {family: dict() for family in FAMILIES}
+
+    for position in range(options.guilds):
+        guild_id = snowflake()
+        data['guilds'][guild_id] = {
+            'id': guild_id,
+            'name': f'Guild {position}',
+            'created_at': '2018-03-02 19:12:55.311000',
+            'icon_url': f'https://cdn.discordapp.com/icons/{guild_id}/{rng.getrandbits(128):032x}.webp'
+        }
+        data['guild_configs'][guild_id] = {
+            'guild': guild_id,
+            'mod_role': None,
+            'admin_role': None,
+            'command_prefix': '!'
+        }
+
+        for role_position in range(options.roles_per_guild):
+            role_id = guild_id if role_position == 0 else snowflake()
+            data['roles'][role_id] = {
+                'id': role_id,
+                'name': '@everyone' if role_position == 0 else f'Role {role_position}',
+                'color': rng.getrandbits(24),
+                'created_at': '2018-03-02 19:12:55.311000',
+                'permissions': rng.getrandbits(31),
+                'position': role_position,
+                'guild': guild_id
+            }
+
+    roles_by_guild = dict()
+    for role in data['roles'].values():
+        roles_by_guild.setdefault(role['guild'], list()).append(role['id'])
+
+    guild_ids = list(data['guilds'])
+    for _ in range(options.users):
+        user_id = snowflake()
+        guilds = rng.sample(guild_ids, min(len(guild_ids), rng.randint(1, 3)))
+
+        data['users'][user_id] = {
+            'id': user_id,
+            'name': f'user{user_id % 100_000}',
+            'discriminator': f'{rng.randint(1, 9999):04}',
+            'created_at': '2019-06-14 11:32:07.618000',
+            'avatar_url': f'https://cdn.discordapp.com/avatars/{user_id}/{rng.getrandbits(128):032x}.webp',
+            'roles': sorted(
+                role for guild in guilds for role in rng.sample(roles_by_guild[guild], rng.randint(1, 3))
+            ),
+            'guilds': guilds
+        }
+
+    return data
+
+
+class FakeSite:
+    """The request handlers and state of the fake API."""
+
+    def __init__(self, options: FakeSiteOptions) -> None:
+        self.options = options
+        self.data = make_dataset(options)
+        self.rng = random.Random(options.seed)
+
+        self.requests = 0
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.chaos_middleware], client_max_size=64 * 1024 * 1024)
+        app.router.add_route('HEAD', '/api/', self.head)
+
+        for family in FAMILIES:
+            app.router.add_get(f'/api/{family}', self.list_records)
+            app.router.add_post(f'/api/{family}', self.create_record)
+            app.router.add_route('*', f'/api/{family}/bulk', self.bulk)
+            app.router.add_get(f'/api/{family}/{{id:\\d+}}', self.get_record)
+            app.router.add_put(f'/api/{family}/{{id:\\d+}}', self.update_record)
+            app.router.add_patch(f'/api/{family}/{{id:\\d+}}', self.update_record)
+            app.router.add_delete(f'/api/{family}/{{id:\\d+}}', self.delete_record)
+
+        return app
+
+    @web.middleware
+    async def chaos_middleware(self, request: web.Request, handler: t.Callable) -> web.StreamResponse:
+        """Add latency to every request and fail or rate limit some of them."""
+        self.requests += 1
+
+        if request.headers.get('Content-Encoding') and not self.options.gzip_requests:
+            return web.json_response({'detail': 'Unsupported content encoding.'}, status=415)
+
+        latency = self.options.latency + self.rng.random() * self.options.jitter
+        if self.rng.random() < self.options.slow_rate:
+            latency += self.options.slow_latency
+
+        if latency:
+            await asyncio.sleep(latency / 1000)
+
+        if self.rng.random() < self.options.rate_limit_rate:
+            return web.json_response({'detail': 'Request was throttled.'}, status=429, headers={'Retry-After': '1'})
+
+        if self.rng.random() < self.options.error_rate:
+            return web.json_response({'detail': 'Service unavailable.'}, status=503)
+
+        return await handler(request)
+
+    @staticmethod
+    def family(request: web.Request) -> str:
+        return request.path.split('/')[2]
+
+    @staticmethod
+    def key(family: str) -> str:
+        return 'guild' if family == 'guild_configs' else 'id'
+
+    def json_response(self, request: web.Request, data: t.Any, status: int = 200) -> web.Response:
+        """Send `data` with an ETag, or 304 if the client already has it. Large bodies are compressed if accepted."""
+        body = json.dumps(data).encode()
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+        if status == 200 and request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+
+        response = web.Response(body=body, status=status, content_type='application/json', headers={'ETag': etag})
+        if self.options.compress_responses and len(body) >= 1024:
+            response.enable_compression()
+
+        return response
+
+    async def head(self, request: web.Request) -> web.Response:
+        return web.Response()
+
+    async def list_records(self, request: web.Request) -> web.Response:
+        """List records, filtered by exact field matches or `field__in` lookups on the query string."""
+        records: t.Iterable[t.Dict] = self.data[self.family(request)].values()
+
+        for name, value in request.query.items():
+            if name in ('limit', 'offset', 'ordering'):
+                continue
+
+            if name.endswith('__in') and not self.options.in_filters:
+                continue
+
+            if name.endswith('__in'):
+                values = set(value.split(','))
+                records = [record for record in records if str(record.get(name[:-4])) in values]
+            else:
+                records = [record for record in records if self.matches(record.get(name), value)]
+
+        records = list(records)
+        if request.query.get('ordering') == 'id':
+            records.sort(key=lambda record: record['id'])
+
+        if not self.options.paginate or 'limit' not in request.query:
+            return self.json_response(request, records)
+
+        limit, offset = int(request.query['limit']), int(request.query.get('offset', 0))
+        return self.json_response(request, {
+            'count': len(records),
+            'next': f'{request.path}?limit={limit}&offset={offset + limit}' if offset + limit < len(records) else None,
+            'previous': None,
+            'results': records[offset:offset + limit]
+        })
+
+    @staticmethod
+    def matches(field: t.Any, value: str) -> bool:
+        if isinstance(field, list):
+            return value in map(str, field)
+
+        return str(field) == value
+
+    async def get_record(self, request: web.Request) -> web.Response:
+        if (record := self.data[self.family(request)].get(int(request.match_info['id']))) is None:
+            return web.json_response({'detail': 'Not found.'}, status=404)
+
+        return self.json_response(request, record)
+
+    async def create_record(self, request: web.Request) -> web.Response:
+        family = self.family(request)
+        record = await request.json()
+
+        if (record_id := record.get(self.key(family))) in self.data[family]:
+            return web.json_response({'id': ['This ID already exists.']}, status=400)
+
+        self.data[family][record_id] = record
+        return web.json_response(record, status=201)
+
+    async def update_record(self, request: web.Request) -> web.Response:
+        family = self.family(request)
+
+        record_id = int(request.match_info['id'])
+
+        if (record := self.data[family].get(record_id)) is None:
+            if not (self.options.upsert and request.method == 'PUT'):
+                return web.json_response({'detail': 'Not found.'}, status=404)
+
+            record = self.data[family][record_id] = await request.json()
+            return web.json_response(record, status=201)
+
+        record.update(await request.json())
+        return web.json_response(record)
+
+    async def delete_record(self, request: web.Request) -> web.Response:
+        if self.data[self.family(request)].pop(int(request.match_info['id']), None) is None:
+            return web.json_response({'detail': 'Not found.'}, status=404)
+
+        return web.Response(status=204)
+
+    async def bulk(self, request: web.Request) -> web.Response:
+        """Create, update or delete a JSON array of records at once; all of them or none are written."""
+        if not self.options.bulk:
+            return web.json_response({'detail': 'Not found.'}, status=404)
+
+        family = self.family(request)
+        key = self.key(family)
+        records = await request.json()
+        ids = [record.get(key) for record in records]
+
+        if request.method == 'POST':
+            if any(record_id in self.data[family] for record_id in ids):
+                return web.json_response({'detail': 'Some IDs already exist.'}, status=400)
+
+            self.data[family].update(zip(ids, records))
+            return web.json_response(records, status=201)
+
+        if any(record_id not in self.data[family] for record_id in ids):
+            return web.json_response({'detail': 'Some IDs do not exist.'}, status=400)
+
+        if request.method == 'DELETE':
+            for record_id in ids:
+                del self.data[family][record_id]
+            return web.Response(status=204)
+
+        if request.method in ('PUT', 'PATCH'):
+            for record_id, record in zip(ids, records):
+                self.data[family][record_id].update(record)
+            return web.json_response(records)
+
+        return web.json_response({'detail': 'Method not allowed.'}, status=405)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of the fake site to `parser`."""
+    defaults = FakeSiteOptions()
+
+    parser.add_argument('--guilds', type=int, default=defaults.guilds)
+    parser.add_argument('--roles-per-guild', type=int, default=defaults.roles_per_guild)
+    parser.add_argument('--users', type=int, default=defaults.users)
+    parser.add_argument('--latency', type=float, default=defaults.latency, help='base latency in milliseconds')
+    parser.add_argument('--jitter', type=float, default=defaults.jitter, help='random extra latency in milliseconds')
+    parser.add_argument('--slow-rate', type=float, default=defaults.slow_rate, help='fraction of slow responses')
+    parser.add_argument(
+        '--slow-latency', type=float, default=defaults.slow_latency, help='extra latency of slow responses in ms'
+    )
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate, help='fraction of 503 responses')
+    parser.add_argument('--rate-limit-rate', type=float, default=defaults.rate_limit_rate, help='fraction of 429s')
+    parser.add_argument('--paginate', action='store_true', help='paginate list endpoints given a `limit`')
+    parser.add_argument('--no-bulk', dest='bulk', action='store_false', help='disable the bulk endpoints')
+    parser.add_argument('--no-in-filters', dest='in_filters', action='store_false', help='ignore `__in` filters')
+    parser.add_argument('--upsert', action='store_true', help='create missing records on PUT')
+    parser.add_argument('--no-gzip-requests', dest='gzip_requests', action='store_false', help='reject gzip bodies')
+    parser.add_argument(
+        '--no-compress-responses', dest='compress_responses', action='store_false', help='never compress responses'
+    )
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+
+
+def options_from_args(args: argparse.Namespace) -> FakeSiteOptions:
+    return FakeSiteOptions(**{field: getattr(args, field) for field in FakeSiteOptions._fields})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run an in-memory fake of the Snek site API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--unix', metavar='PATH', help='serve on a Unix domain socket instead of TCP')
+    add_arguments(parser)
+
+    args = parser.parse_args()
+    app = FakeSite(options_from_args(args)).create_app()
+
+    if args.unix:
+        web.run_app(app, path=args.unix)
+    else:
+        web.run_app(app, host=args.host, port=args.port)
@@ -0,0 +1,76 @@
+"""
+Compare how fast `APIClient.iter_pages` streams the `users` list of an in-process fake Snek site with each JSON codec.
+
+Run with `python -m benchmarks.pagination [users] [repeat]`.
+"""
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+from benchmarks.fake_site import FakeSite, FakeSiteOptions
+from snek.api import APIClient
+from snek.api.client import STREAM_CHUNK_SIZE
+from snek.api.codec import JSONCodec, orjson, OrjsonCodec
+from snek.api.pagination import JSONArrayParser
+
+
+def parse(body: bytes, codec: JSONCodec) -> int:
+    """Parse `body` in chunks like `iter_pages` does, without the HTTP requests, and return the amount of items."""
+    parser = JSONArrayParser(codec.loads)
+    amount = 0
+
+    for start in range(0, len(body), STREAM_CHUNK_SIZE):
+        amount += len(parser.feed(body[start:start + STREAM_CHUNK_SIZE]))
+
+    return amount + len(parser.feed(b'', final=True))
+
+
+async def main(amount: int = 50_000, repeat: int = 5) -> None:
+    # Uncompressed responses, so the time spent decoding JSON isn't hidden behind decompression
+    site = FakeSite(FakeSiteOptions(guilds=40, users=amount, compress_responses=False))
+    runner = web.AppRunner(site.create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+
+    os.environ['SNEK_SITE_URL'] = f'http://127.0.0.1:{runner.addresses[0][1]}'
+    os.environ.setdefault('SNEK_API_TOKEN', 'benchmark')
+
+    codecs = [JSONCodec()]
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    else:
+        print('orjson is not installed, only benchmarking the standard library.')
+
+    body = codecs[0].dumps(list(site.data['users'].values()))
+    print(f'{amount:,} users, {len(body) / 1024 / 1024:.1f} MiB encoded\n')
+    print(f'{"codec":<8} {"parse":>10} {"iter_pages":>12} {"per user":>10}')
+
+    try:
+        for codec in codecs:
+            client = APIClient(loop=asyncio.get_event_loop(), codec=codec)
+            await client.ready.wait()
+
+            parsed, listed = float('inf'), float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                assert parse(body, codec) == amount
+                parsed = min(parsed, time.perf_counter() - started)
+
+                started, users = time.perf_counter(), 0
+                async for page in client.iter_pages('users'):
+                    users += len(page)
+                listed = min(listed, time.perf_counter() - started)
+                assert users == amount
+
+            await client.close()
+            print(f'{codec.name:<8} {parsed * 1000:>8.1f}ms {listed * 1000:>10.1f}ms {listed / amount * 1e6:>8.2f}us')
+
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*map(int, sys.argv[1:3])))
@@ -0,0 +1,70 @@
+"""
+Compare the memory and diff speed of the user syncer's records as namedtuples and in a record store.
+
+Run with `python -m benchmarks.record_store [users] [repeat]`.
+"""
+import asyncio
+import random
+import sys
+import timeit
+import tracemalloc
+import typing as t
+
+from benchmarks.codec import make_users
+from snek.exts.syncer.diff import iter_records, merge_diff
+from snek.exts.syncer.records import RecordStore
+from snek.exts.syncer.syncers.base import sorted_records
+from snek.exts.syncer.syncers.user import User, USER_COLUMNS
+
+
+def user_fields(users: t.List[t.Dict], rename_rate: float = 0.0) -> t.Iterator[tuple]:
+    """Yield the fields of `users` in the order of the User record, with `rename_rate` of them renamed."""
+    rng = random.Random(1)
+
+    # Strings are copied, as the syncer formats them anew from the cache instead of sharing them
+    for user in users:
+        yield (
+            user['id'],
+            user['name'].encode().decode() + ('!' if rng.random() < rename_rate else ''),
+            user['discriminator'].encode().decode(),
+            user['created_at'].encode().decode(),
+            user['avatar_url'].encode().decode(),
+            tuple(user['roles']),
+            tuple(sorted(user['guilds']))
+        )
+
+
+def traced(build: t.Callable[[], t.Any]) -> t.Tuple[t.Any, int]:
+    """Return what `build` returns and how many bytes of it are still allocated afterwards."""
+    tracemalloc.start()
+    try:
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main(amount: int = 100_000, repeat: int = 5) -> None:
+    users = make_users(amount)
+    db_records = sorted((User(*fields) for fields in user_fields(users)), key=lambda user: user.id)
+
+    # The cached users, of which a tenth changed since they were written to the database
+    namedtuples, namedtuples_size = traced(lambda: {fields[0]: User(*fields) for fields in user_fields(users, 0.1)})
+    store, store_size = traced(lambda: RecordStore(User, USER_COLUMNS, user_fields(users, 0.1)))
+
+    print(f'{amount:,} users\n')
+    print(f'{"records":<12} {"memory":>10} {"per user":>10} {"diff":>10} {"updated":>10}')
+
+    for name, records, size in (('namedtuples', namedtuples, namedtuples_size), ('store', store, store_size)):
+        def diff() -> t.Any:
+            return asyncio.run(merge_diff(sorted_records(records), iter_records(db_records)))
+
+        elapsed = min(timeit.repeat(diff, number=1, repeat=repeat))
+        print(
+            f'{name:<12} {size / 1024 / 1024:8.1f}MiB {size / amount:8.0f} B '
+            f'{elapsed * 1000:8.0f}ms {len(diff().updated):>10,}'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,36 @@
+from snek.api.breaker import BreakerConfig, BreakerState
+from snek.api.bulk import BulkResult, gather_writes, WriteConfig
+from snek.api.cache import CacheConfig, CacheStats
+from snek.api.client import APIClient
+from snek.api.compression import CompressionConfig, CompressionStats
+from snek.api.errors import BulkWriteError, CircuitOpenError, ResponseCodeError
+from snek.api.hedging import HedgeConfig
+from snek.api.loader import LoaderConfig
+from snek.api.pool import PoolConfig, PoolStats
+from snek.api.retry import RetryPolicy
+from snek.api.scheduler import LaneStats, Priority, request_priority, SchedulerConfig
+
+__all__ = (
+    'APIClient',
+    'BreakerConfig',
+    'BreakerState',
+    'BulkResult',
+    'BulkWriteError',
+    'CacheConfig',
+    'CacheStats',
+    'CircuitOpenError',
+    'CompressionConfig',
+    'CompressionStats',
+    'gather_writes',
+    'HedgeConfig',
+    'LaneStats',
+    'LoaderConfig',
+    'PoolConfig',
+    'PoolStats',
+    'Priority',
+    'request_priority',
+    'ResponseCodeError',
+    'RetryPolicy',
+    'SchedulerConfig',
+    'WriteConfig'
+)
@@ -0,0 +1,122 @@
+from enum import Enum
+import logging
+import time
+import typing as t
+
+from snek.api.config import from_env
+from snek.api.endpoints import endpoint_family
+from snek.api.errors import CircuitOpenError
+
+log = logging.getLogger(__name__)
+
+
+class BreakerState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+
+class BreakerConfig(t.NamedTuple):
+    """When circuit breakers open and how long they stay open."""
+
+    breaker_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> 'BreakerConfig':
+        """Create a config from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an endpoint family of the Snek API keeps failing.
+
+    The breaker opens after `threshold` consecutive server errors or connection failures.
+    Once `reset_timeout` seconds have passed, a single probe request is let through:
+    the breaker closes if it succeeds and opens again if it fails.
+    """
+
+    def __init__(self, family: str, threshold: int, reset_timeout: float) -> None:
+        self.family = family
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until a probe request will be let through."""
+        if self.state is BreakerState.CLOSED:
+            return 0.0
+
+        since = self.opened_at if self.state is BreakerState.OPEN else self.probe_started_at
+        return max(0.0, since + self.reset_timeout - time.monotonic())
+
+    def before_request(self) -> None:
+        """Raise `CircuitOpenError` if a request should not be sent right now."""
+        if self.state is BreakerState.CLOSED:
+            return
+
+        # A probe that never reported back (e.g. it was cancelled) must not block the breaker forever
+        if self.retry_after > 0:
+            raise CircuitOpenError(self.family, self.retry_after)
+
+        log.info(f'Probing the Snek API for `{self.family}` after the circuit breaker opened.')
+        self.state = BreakerState.HALF_OPEN
+        self.probe_started_at = time.monotonic()
+
+    def record(self, status: t.Optional[int]) -> None:
+        """Record the outcome of a request; a `status` of None means no response was received."""
+        if status is not None and status < 500:
+            if self.state is not BreakerState.CLOSED:
+                log.info(f'Circuit breaker for `{self.family}` closed; the Snek API is responding again.')
+
+            self.state = BreakerState.CLOSED
+            self.failures = 0
+            return
+
+        self.failures += 1
+
+        if self.state is BreakerState.HALF_OPEN or self.failures >= self.threshold:
+            if self.state is not BreakerState.OPEN:
+                log.warning(f'Circuit breaker for `{self.family}` opened after {self.failures} failures.')
+
+            self.state = BreakerState.OPEN
+            self.opened_at = time.monotonic()
+
+
+class BreakerRegistry:
+    """Lazily created circuit breakers, one per endpoint family."""
+
+    def __init__(self, config: BreakerConfig) -> None:
+        self.config = config
+        self.breakers: t.Dict[str, CircuitBreaker] = dict()
+
+    def __getitem__(self, endpoint: str) -> CircuitBreaker:
+        family = endpoint_family(endpoint)
+
+        if (breaker := self.breakers.get(family)) is None:
+            breaker = self.breakers[family] = CircuitBreaker(
+                family,
+                self.config.breaker_threshold,
+                self.config.breaker_reset_timeout
+            )
+
+        return breaker
+
+    @property
+    def degraded(self) -> t.List[str]:
+        """The endpoint families whose breakers are not closed."""
+        return sorted(family for family, breaker in self.breakers.items() if breaker.state is not BreakerState.CLOSED)
+
+    def is_degraded(self, endpoint: t.Optional[str] = None) -> bool:
+        """Return True if the family of `endpoint`, or any family if not given, is failing."""
+        if endpoint is None:
+            return bool(self.degraded)
+
+        breaker = self.breakers.get(endpoint_family(endpoint))
+        return breaker is not None and breaker.state is not BreakerState.CLOSED
@@ -0,0 +1,163 @@
+import asyncio
+from collections import deque, namedtuple
+from contextlib import asynccontextmanager
+import logging
+import typing as t
+
+import aiohttp
+
+from snek.api.config import from_env
+from snek.api.errors import ResponseCodeError
+
+log = logging.getLogger(__name__)
+
+BulkResult = namedtuple('BulkResult', ('succeeded', 'failed'))
+BulkResult.__doc__ = """
+The outcome of a bulk write: the number of records written and the `(record, error)` pairs that failed.
+"""
+
+
+class WriteConfig(t.NamedTuple):
+    """
+    How records are written to the Snek API.
+
+    With `upsert`, the API is expected to create a record on a PUT to a resource which
+    doesn't exist yet, so upserts take a single request.
+
+    Bulk writes send up to `write_concurrency` requests at once. The limit is halved, down to
+    `write_min_concurrency`, whenever the API is overloaded (429, 5xx or no response at all),
+    and grows back by about one request per round of successful writes.
+    """
+
+    upsert: bool = False
+    write_concurrency: int = 8
+    write_min_concurrency: int = 1
+
+    @classmethod
+    def from_env(cls) -> 'WriteConfig':
+        """Create a config from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+
+class AdaptiveLimiter:
+    """
+    Bound concurrent writes with a limit that adapts to the load of the API.
+
+    The limit grows additively while writes succeed and is halved when the API is overloaded.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1) -> None:
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.waiters: t.Deque[asyncio.Future] = deque()
+
+        self.backoffs = 0
+
+    def _increase(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _decrease(self, reason: str) -> None:
+        limit = max(self.min_limit, self.limit / 2)
+
+        if int(limit) < int(self.limit):
+            log.debug(f'Lowering the concurrency of writes to {int(limit)} after {reason}.')
+
+        self.limit = limit
+        self.backoffs += 1
+
+    def _wake(self) -> None:
+        while self.waiters and self.in_flight < int(self.limit):
+            if not (waiter := self.waiters.popleft()).done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self) -> t.AsyncIterator[None]:
+        """Hold a write slot, adapting the limit to the outcome of the request made while holding it."""
+        if self.waiters or self.in_flight >= int(self.limit):
+            waiter = asyncio.get_event_loop().create_future()
+            self.waiters.append(waiter)
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # The slot may have been handed over right before the cancellation
+                if waiter.done() and not waiter.cancelled():
+                    self.in_flight -= 1
+                    self._wake()
+                elif waiter in self.waiters:
+                    self.waiters.remove(waiter)
+                raise
+
+        else:
+            self.in_flight += 1
+
+        try:
+            yield
+
+        except ResponseCodeError as err:
+            if err.status == 429 or err.status >= 500:
+                self._decrease(f'a {err.status} response')
+            raise
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            self._decrease(repr(err))
+            raise
+
+        else:
+            self._increase()
+
+        finally:
+            self.in_flight -= 1
+            self._wake()
+
+
+async def gather_writes(*writes: t.Awaitable) -> t.List[t.Any]:
+    """
+    Run `writes` concurrently and return their results, like `asyncio.gather`.
+
+    As soon as one of them raises, the others are cancelled and waited for before the exception
+    is raised, so none of them is still in flight once the caller moves on, e.g. to writes of
+    records which reference these.
+    """
+    tasks = [asyncio.ensure_future(write) for write in writes]
+
+    try:
+        return await asyncio.gather(*tasks)
+
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def chunk_records(
+    records: t.Sequence[t.Dict],
+    encoded: t.Sequence[bytes],
+    max_records: int,
+    max_bytes: int
+) -> t.Iterator[t.Tuple[t.List[t.Dict], bytes]]:
+    """
+    Group `records` into chunks of at most `max_records` records and `max_bytes` bytes.
+
+    Each chunk is yielded with its JSON array body, built from the already `encoded` records.
+    A single record larger than `max_bytes` is sent in a chunk of its own.
+    """
+    chunk, parts, size = list(), list(), 2
+
+    for record, part in zip(records, encoded):
+        if chunk and (len(chunk) >= max_records or size + len(part) + 1 > max_bytes):
+            yield chunk, b'[' + b','.join(parts) + b']'
+            chunk, parts, size = list(), list(), 2
+
+        chunk.append(record)
+        parts.append(part)
+        size += len(part) + 1
+
+    if chunk:
+        yield chunk, b'[' + b','.join(parts) + b']'
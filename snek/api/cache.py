@@ -0,0 +1,207 @@
+from collections import namedtuple, OrderedDict
+import logging
+import time
+import typing as t
+
+from snek.api.config import from_env
+from snek.api.endpoints import endpoint_family, endpoint_template
+from snek.api.errors import ResponseCodeError
+
+log = logging.getLogger(__name__)
+
+CacheStats = namedtuple(
+    'CacheStats',
+    ('entries', 'size', 'hits', 'misses', 'stale_hits', 'revalidated', 'evictions', 'invalidations')
+)
+
+# Seconds a response stays fresh, by endpoint template. A trailing `?` matches requests with query
+# parameters. A TTL of 0 means the response is always revalidated through its ETag before it's used.
+# Endpoints which aren't listed are never cached.
+DEFAULT_TTLS = {
+    'users/{id}': 60.0,
+    'users?': 30.0,
+    'users': 0.0,
+    'roles': 0.0,
+    'guilds': 0.0,
+    'guild_configs': 0.0,
+    'guild_configs/{id}': 0.0
+}
+
+
+class CacheConfig(t.NamedTuple):
+    """Size limits and timings of the Snek API response cache."""
+
+    cache_enabled: bool = True
+    cache_max_entries: int = 2048
+    cache_max_bytes: int = 16 * 1024 * 1024
+    cache_negative_ttl: float = 10.0
+    cache_stale_ttl: float = 300.0
+    cache_stale_timeout: float = 0.5
+
+    @classmethod
+    def from_env(cls) -> 'CacheConfig':
+        """Create a config from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+
+class CacheEntry:
+    """A cached response, or a cached error for negatively cached responses."""
+
+    __slots__ = ('endpoint', 'data', 'error', 'etag', 'size', 'ttl', 'expires_at')
+
+    def __init__(
+        self,
+        endpoint: str,
+        data: t.Any,
+        error: t.Optional[ResponseCodeError],
+        etag: t.Optional[str],
+        size: int,
+        ttl: float
+    ) -> None:
+        self.endpoint = endpoint
+        self.data = data
+        self.error = error
+        self.etag = etag
+        self.size = size
+        self.ttl = ttl
+        self.expires_at = time.monotonic() + ttl
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def result(self) -> t.Any:
+        """Return the cached data, or raise a copy of the cached error."""
+        if self.error is not None:
+            raise ResponseCodeError(self.error.response, self.error.response_json, self.error.response_text)
+
+        return self.data
+
+
+class ResponseCache:
+    """
+    An LRU cache of decoded GET responses, bounded by entry count and total body size.
+
+    Entries are indexed by endpoint so writes can invalidate every cached variant of a resource.
+    """
+
+    def __init__(self, config: CacheConfig, ttls: t.Optional[t.Dict[str, float]] = None) -> None:
+        self.config = config
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+
+        self.entries: t.OrderedDict[t.Hashable, CacheEntry] = OrderedDict()
+        self.index: t.Dict[str, t.Set[t.Hashable]] = dict()
+        self.versions: t.Dict[str, int] = dict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            entries=len(self.entries),
+            size=self.size,
+            hits=self.hits,
+            misses=self.misses,
+            stale_hits=self.stale_hits,
+            revalidated=self.revalidated,
+            evictions=self.evictions,
+            invalidations=self.invalidations
+        )
+
+    def ttl_for(self, endpoint: str, params: t.Any) -> t.Optional[float]:
+        """Return the TTL for a GET of `endpoint` with `params`, or None if it shouldn't be cached."""
+        return self.ttls.get(f'{endpoint_template(endpoint)}{"?" if params else ""}')
+
+    def version(self, endpoint: str) -> int:
+        """
+        Return the number of invalidations of the family of `endpoint`.
+
+        A response is only stored if no write invalidated its family while it was being fetched.
+        """
+        return self.versions.get(endpoint_family(endpoint), 0)
+
+    def get(self, key: t.Hashable) -> t.Optional[CacheEntry]:
+        """Return the entry for `key`, marking it as recently used."""
+        if (entry := self.entries.get(key)) is not None:
+            self.entries.move_to_end(key)
+
+        return entry
+
+    def can_serve_stale(self, entry: CacheEntry) -> bool:
+        """Return True if `entry` may be served while it is revalidated."""
+        # Always-revalidated endpoints and cached errors are never served stale
+        if entry.ttl <= 0 or entry.error is not None:
+            return False
+
+        return time.monotonic() < entry.expires_at + self.config.cache_stale_ttl
+
+    def store(
+        self,
+        key: t.Hashable,
+        endpoint: str,
+        size: int,
+        ttl: float,
+        version: int,
+        data: t.Any = None,
+        error: t.Optional[ResponseCodeError] = None,
+        etag: t.Optional[str] = None
+    ) -> None:
+        """Cache a response, unless it's outdated, it could never be used again or it's too large."""
+        self.discard(key)
+
+        if version != self.version(endpoint):
+            return
+
+        if (ttl <= 0 and etag is None) or size > self.config.cache_max_bytes:
+            return
+
+        self.entries[key] = CacheEntry(endpoint, data, error, etag, size, ttl)
+        self.index.setdefault(endpoint, set()).add(key)
+        self.size += size
+
+        while len(self.entries) > self.config.cache_max_entries or self.size > self.config.cache_max_bytes:
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+
+    def refresh(self, entry: CacheEntry) -> None:
+        """Mark `entry` as fresh again after the API confirmed it's unchanged."""
+        entry.expires_at = time.monotonic() + entry.ttl
+        self.revalidated += 1
+
+    def discard(self, key: t.Hashable) -> None:
+        if (entry := self.entries.pop(key, None)) is None:
+            return
+
+        self.size -= entry.size
+
+        keys = self.index[entry.endpoint]
+        keys.discard(key)
+        if not keys:
+            del self.index[entry.endpoint]
+
+    def invalidate(self, endpoint: str, record_id: t.Any = None) -> None:
+        """
+        Discard the entries a write to `endpoint` may have made outdated.
+
+        This is the written resource itself, the list endpoint of its family and, when
+        given, the resource with `record_id` (e.g. the one created by a POST to the family).
+        """
+        endpoint = endpoint.strip('/')
+        family = endpoint_family(endpoint)
+
+        self.versions[family] = self.versions.get(family, 0) + 1
+
+        endpoints = {endpoint, family}
+        if record_id is not None:
+            endpoints.add(f'{family}/{record_id}')
+
+        for invalidated in endpoints:
+            for key in tuple(self.index.get(invalidated, ())):
+                self.discard(key)
+                self.invalidations += 1
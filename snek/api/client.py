@@ -0,0 +1,773 @@
+import asyncio
+from collections import namedtuple
+from contextlib import asynccontextmanager
+import itertools
+import logging
+import os
+import time
+import typing as t
+from urllib.parse import quote
+
+import aiohttp
+
+from snek.api.breaker import BreakerConfig, BreakerRegistry
+from snek.api.bulk import AdaptiveLimiter, BulkResult, chunk_records, gather_writes, WriteConfig
+from snek.api.cache import CacheConfig, ResponseCache
+from snek.api.codec import default_codec, JSONCodec
+from snek.api.compression import CompressionConfig, Compressor
+from snek.api.endpoints import request_key
+from snek.api.errors import CircuitOpenError, ResponseCodeError
+from snek.api.hedging import HedgeConfig, HedgePolicy
+from snek.api.loader import BatchLoader, LoaderConfig
+from snek.api.metrics import APIMetrics
+from snek.api.pagination import JSONArrayParser
+from snek.api.pool import parse_site_url, PoolConfig, PoolMonitor, PoolStats
+from snek.api.retry import IDEMPOTENT_METHODS, RetryPolicy
+from snek.api.scheduler import RequestScheduler, SchedulerConfig
+from snek.api.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+APIResponse = namedtuple('APIResponse', ('response', 'status', 'headers', 'body'))
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+BULK_MAX_RECORDS = 500
+BULK_MAX_BYTES = 1024 * 1024
+
+
+class APIClient:
+    """Snek Site API Wrapper."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        pool_config: t.Optional[PoolConfig] = None,
+        retry_policy: t.Optional[RetryPolicy] = None,
+        breaker_config: t.Optional[BreakerConfig] = None,
+        cache_config: t.Optional[CacheConfig] = None,
+        cache_ttls: t.Optional[t.Dict[str, float]] = None,
+        scheduler_config: t.Optional[SchedulerConfig] = None,
+        codec: t.Optional[JSONCodec] = None,
+        compression_config: t.Optional[CompressionConfig] = None,
+        loader_config: t.Optional[LoaderConfig] = None,
+        hedge_config: t.Optional[HedgeConfig] = None,
+        write_config: t.Optional[WriteConfig] = None,
+        **kwargs
+    ) -> None:
+        if token := os.environ.get('SNEK_API_TOKEN'):
+            headers = {
+                'Authorization': f'Token {token}'
+            }
+
+            if 'headers' in kwargs:
+                kwargs['headers'].update(headers)
+            else:
+                kwargs['headers'] = headers
+
+        else:
+            log.critical(
+                'Could not find "SNEK_API_TOKEN" environment variable '
+                '- WILL NOT BE ABLE TO COMMUNICATE WITH THE SNEK API!!'
+            )
+
+        self.loop = loop
+        self.session = None
+
+        self.pool_config = pool_config or PoolConfig.from_env()
+        self.pool_monitor = PoolMonitor()
+
+        self.retry_policy = retry_policy or RetryPolicy.from_env()
+        self.breakers = BreakerRegistry(breaker_config or BreakerConfig.from_env())
+
+        self.codec = codec or default_codec()
+        log.debug(f'Using the {self.codec.name} codec for Snek API bodies.')
+
+        self.compressor = Compressor(compression_config or CompressionConfig.from_env())
+
+        self.metrics = APIMetrics()
+        self.hedging = HedgePolicy(hedge_config or HedgeConfig.from_env())
+        self.scheduler = RequestScheduler(scheduler_config or SchedulerConfig.from_env())
+        self.single_flight = SingleFlight()
+        self.write_config = write_config or WriteConfig.from_env()
+        self.bulk_unsupported: t.Set[str] = set()
+        # Endpoints whose bulk endpoint answered, and the locks held by the first bulk write of the others
+        self.bulk_probed: t.Set[str] = set()
+        self.bulk_probes: t.Dict[str, asyncio.Lock] = dict()
+        self.upsert_supported = self.write_config.upsert
+        self.write_limiter = AdaptiveLimiter(
+            self.write_config.write_concurrency,
+            self.write_config.write_min_concurrency
+        )
+
+        self.loader_config = loader_config or LoaderConfig.from_env()
+        self.loaders: t.Dict[str, BatchLoader] = dict()
+
+        cache_config = cache_config or CacheConfig.from_env()
+        self.cache = ResponseCache(cache_config, cache_ttls) if cache_config.cache_enabled else None
+
+        self.ready = asyncio.Event(loop=loop)
+        self._creation_task = None
+        self._default_session_kwargs = kwargs
+
+        self.recreate()
+
+    async def _create_session(self, **session_kwargs) -> None:
+        """
+        Create the aiohttp session with `session_kwargs` and set the ready event.
+
+        Unless given explicitly, the connector and timeouts are built from the pool config.
+        The connector goes over a Unix domain socket if `SNEK_SITE_URL` is a `unix://` address.
+        """
+        await self.close()
+
+        kwargs = {**self._default_session_kwargs, **session_kwargs}
+        if 'connector' not in kwargs:
+            _, socket_path = parse_site_url(self.site_address())
+            kwargs['connector'] = self.pool_config.create_connector(socket_path)
+        if 'timeout' not in kwargs:
+            kwargs['timeout'] = self.pool_config.create_timeout()
+        kwargs['trace_configs'] = [*kwargs.get('trace_configs', ()), self.pool_monitor.trace_config]
+
+        self.session = aiohttp.ClientSession(**kwargs)
+        self.ready.set()
+
+    async def warm_up(self) -> None:
+        """
+        Open keep-alive connections to the Snek site ahead of the first real requests.
+
+        The requests are sent concurrently so each one needs its own connection, which
+        is then returned to the pool. Failures are logged rather than raised.
+        """
+        await self.ready.wait()
+
+        async def open_connection() -> None:
+            async with self.session.head(self.site_url(), allow_redirects=False):
+                pass
+
+        amount = self.pool_config.warm_connections
+        results = await asyncio.gather(*(open_connection() for _ in range(amount)), return_exceptions=True)
+
+        if failures := [result for result in results if isinstance(result, Exception)]:
+            log.warning(f'Failed to warm up {len(failures)}/{amount} Snek API connections: {failures[0]!r}')
+        else:
+            log.debug(f'Warmed up {amount} Snek API connections.')
+
+    @property
+    def pool_stats(self) -> PoolStats:
+        """Connection pool usage of the current session."""
+        return self.pool_monitor.stats(self.session.connector if self.session else None)
+
+    async def close(self) -> None:
+        """Close the aiohttp session and clear the ready event."""
+        if self.session:
+            await self.session.close()
+
+        self.ready.clear()
+
+    def recreate(self, force: bool = False, **session_kwargs) -> None:
+        """
+        Schedules the aiohttp session to be created with `session_kwargs` if it is closed.
+
+        If `force` is True, the session will be recreated even if one is open. If a task
+        to create the session is pending, it will be cancelled.
+        """
+        if force or self.session is None or self.session.closed:
+            # Cancel creation task if one exists
+            if force and self._creation_task:
+                self._creation_task.cancel()
+
+            # Don't schedule a task if one is already in progress
+            if force or self._creation_task is None or self._creation_task.done():
+                self._creation_task = self.loop.create_task(self._create_session(**session_kwargs))
+
+    def maybe_raise_for_status(self, response: APIResponse, should_raise: bool) -> None:
+        """Raise ResponseCodeError for non-OK response if an exception should be raised."""
+        if should_raise and response.status >= 400:
+            try:
+                response_json = self.codec.loads(response.body)
+            except ValueError:
+                response_text = response.body.decode(errors='replace')
+                raise ResponseCodeError(response=response.response, response_text=response_text)
+
+            raise ResponseCodeError(response=response.response, response_json=response_json)
+
+    @staticmethod
+    def site_address() -> str:
+        return os.environ.get("SNEK_SITE_URL", "https://sneknetwork.com")
+
+    @classmethod
+    def site_url(cls) -> str:
+        base_url, _ = parse_site_url(cls.site_address())
+        return f'{base_url}/api/'
+
+    @classmethod
+    def endpoint_url(cls, endpoint: str) -> str:
+        return f'{cls.site_url()}{quote(endpoint)}'
+
+    async def _send(self, method: str, endpoint: str, **kwargs) -> APIResponse:
+        """
+        Send a single HTTP request and return the response along with its body.
+
+        A `json` body is encoded with the client's codec, and large bodies are gzipped if request
+        compression is enabled. Should the Snek API reject a compressed body with 415, compression
+        is disabled and the request is sent again uncompressed. The request waits for a slot in
+        the scheduler lane of the current request priority, and is recorded in the metrics once
+        it has one.
+        """
+        await self.ready.wait()
+
+        if 'json' in kwargs:
+            kwargs['data'] = self.codec.dumps(kwargs.pop('json'))
+            kwargs['headers'] = {'Content-Type': self.codec.content_type, **(kwargs.get('headers') or dict())}
+
+        send_kwargs = kwargs
+        if isinstance(data := kwargs.get('data'), bytes) and (compressed := await self.compressor.compress(data)):
+            headers = {**(kwargs.get('headers') or dict()), 'Content-Encoding': 'gzip'}
+            send_kwargs = {**kwargs, 'data': compressed, 'headers': headers}
+
+        request_size = len(data) if isinstance(data := send_kwargs.get('data'), (bytes, str)) else 0
+
+        async with self.scheduler.slot():
+            started = time.perf_counter()
+            status, response_size = None, 0
+
+            try:
+                async with self.session.request(method, self.endpoint_url(endpoint), **send_kwargs) as resp:
+                    status, body = resp.status, await resp.read()
+                    response_size = len(body)
+                    self.compressor.record_response(resp.headers, response_size)
+                    response = APIResponse(resp, resp.status, resp.headers, body)
+
+            finally:
+                latency = time.perf_counter() - started
+                self.metrics.record(method, endpoint, status, latency, request_size, response_size)
+
+                if method == 'GET' and status is not None and status < 500:
+                    self.hedging.observe(endpoint, latency)
+
+        if status == 415 and send_kwargs is not kwargs:
+            self.compressor.reject(kwargs['data'], send_kwargs['data'])
+            return await self._send(method, endpoint, **kwargs)
+
+        return response
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> APIResponse:
+        """
+        Send an HTTP request to the Snek API and return the final response.
+
+        Idempotent requests which fail with a server error, a timeout or a connection error are
+        retried with jittered exponential backoff. Rate limited (429) requests are retried after
+        their `Retry-After`. `CircuitOpenError` is raised without sending anything while the
+        circuit breaker of the endpoint's family is open.
+        """
+        method = method.upper()
+        breaker = self.breakers[endpoint]
+
+        for attempt in itertools.count():
+            breaker.before_request()
+
+            try:
+                resp = await self._send(method, endpoint, **kwargs)
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as err:
+                breaker.record(None)
+
+                if not self.retry_policy.should_retry(method, attempt):
+                    raise
+
+                delay = self.retry_policy.delay(attempt)
+                log.debug(f'{method} {endpoint} failed with {err!r}, retrying in {delay:.2f}s.')
+
+            else:
+                breaker.record(resp.status)
+
+                if not self.retry_policy.should_retry(method, attempt, resp.status):
+                    return resp
+
+                if (delay := self.retry_policy.delay(attempt, resp.headers.get('Retry-After'))) is None:
+                    return resp
+
+                log.debug(f'{method} {endpoint} responded with {resp.status}, retrying in {delay:.2f}s.')
+
+            await asyncio.sleep(delay)
+
+    async def _hedged_request(self, method: str, endpoint: str, **kwargs) -> APIResponse:
+        """
+        Send an idempotent request like `_request`, and send it again if the first is slow to answer.
+
+        The second request is sent once the hedging delay of the endpoint has passed, if the hedging
+        budget allows it. Whichever request answers first is returned and the other is cancelled.
+        An exception is only raised once both have failed.
+        """
+        tasks = {asyncio.ensure_future(self._request(method, endpoint, **kwargs))}
+
+        try:
+            if (delay := self.hedging.delay(endpoint)) is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+
+                if not done and self.hedging.acquire():
+                    log.debug(f'{method} {endpoint} took longer than {delay:.3f}s, hedging it.')
+                    hedge = asyncio.ensure_future(self._request(method, endpoint, **kwargs))
+                    tasks.add(hedge)
+
+                    while True:
+                        done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                        task = next((task for task in done if task.exception() is None), None)
+
+                        if task is not None or not tasks:
+                            task = task or done.pop()
+                            self.hedging.hedge_wins += task is hedge
+                            return task.result()
+
+            return await next(iter(tasks))
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _read_result(self, response: APIResponse, raise_for_status: bool) -> t.Optional[t.Dict]:
+        """
+        Return the decoded JSON of `response`, raising ResponseCodeError if it's an error that should be raised.
+
+        Like `aiohttp.ClientResponse.json`, None is returned for a response without content.
+        """
+        if response.status == 204:
+            return None
+
+        self.maybe_raise_for_status(response, raise_for_status)
+        if not response.body.strip():
+            return None
+        return self.codec.loads(response.body)
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        raise_for_status: bool = True,
+        hedge: bool = False,
+        **kwargs
+    ) -> t.Optional[t.Dict]:
+        """
+        Send an HTTP request to the Snek API and return the JSON response.
+
+        Idempotent requests are hedged if `hedge` is True. Any request other than a GET
+        invalidates the cached responses it may have outdated.
+        """
+        send = self._hedged_request if hedge and method.upper() in IDEMPOTENT_METHODS else self._request
+
+        try:
+            return self._read_result(await send(method, endpoint, **kwargs), raise_for_status)
+
+        finally:
+            if self.cache is not None and method.upper() != 'GET':
+                payload = kwargs.get('json')
+                self.cache.invalidate(endpoint, payload.get('id') if isinstance(payload, dict) else None)
+
+    async def _cached_get(
+        self,
+        key: t.Hashable,
+        ttl: float,
+        endpoint: str,
+        raise_for_status: bool,
+        hedge: bool,
+        **kwargs
+    ) -> t.Optional[t.Dict]:
+        """
+        Serve a GET from the cache, revalidating or fetching it if needed.
+
+        Expired entries are revalidated with their ETag. While an entry is revalidated, it is
+        served stale if the API doesn't answer within the stale timeout or fails.
+        """
+        if (entry := self.cache.get(key)) is not None and entry.fresh:
+            self.cache.hits += 1
+            return entry.result()
+
+        self.cache.misses += 1
+        fetch = self.single_flight.do(
+            key,
+            lambda: self._fetch_into_cache(key, ttl, endpoint, raise_for_status, hedge, **kwargs)
+        )
+
+        if entry is None or not self.cache.can_serve_stale(entry):
+            return await fetch
+
+        try:
+            return await asyncio.wait_for(fetch, self.cache.config.cache_stale_timeout)
+
+        except (asyncio.TimeoutError, aiohttp.ClientError, CircuitOpenError) as err:
+            log.debug(f'Serving stale {endpoint} while it is revalidated: {err!r}')
+
+        except ResponseCodeError as err:
+            if err.status < 500:
+                raise
+
+            log.debug(f'Serving stale {endpoint} after revalidation failed with {err.status}.')
+
+        self.cache.stale_hits += 1
+        return entry.result()
+
+    async def _fetch_into_cache(
+        self,
+        key: t.Hashable,
+        ttl: float,
+        endpoint: str,
+        raise_for_status: bool,
+        hedge: bool,
+        **kwargs
+    ) -> t.Optional[t.Dict]:
+        """Fetch a GET, conditionally if its cached entry has an ETag, and store the result in the cache."""
+        version = self.cache.version(endpoint)
+
+        headers = dict()
+        if (entry := self.cache.get(key)) is not None and entry.etag is not None:
+            headers['If-None-Match'] = entry.etag
+
+        send = self._hedged_request if hedge else self._request
+        resp = await send('GET', endpoint, headers=headers, **kwargs)
+        if resp.status == 304 and entry is not None:
+            self.cache.refresh(entry)
+            return entry.result()
+
+        try:
+            data = self._read_result(resp, raise_for_status)
+
+        except ResponseCodeError as err:
+            if err.status == 404:
+                self.cache.store(key, key[0], len(resp.body), self.cache.config.cache_negative_ttl, version, error=err)
+            raise
+
+        self.cache.store(key, key[0], len(resp.body), ttl, version, data=data, etag=resp.headers.get('ETag'))
+        return data
+
+    async def get(self, endpoint: str, raise_for_status: bool = True, hedge: bool = False, **kwargs) -> t.Dict:
+        """
+        Snek API GET request.
+
+        Concurrent identical GETs share a single request and the same decoded result,
+        so the result must be treated as read-only. Endpoints with a TTL are served
+        through the response cache. If `hedge` is True, a slow request is sent again
+        and the first response is used, which suits latency-sensitive commands.
+        """
+        if (key := request_key(endpoint, raise_for_status, kwargs)) is None:
+            return await self.request("GET", endpoint, raise_for_status=raise_for_status, hedge=hedge, **kwargs)
+
+        if self.cache is not None and (ttl := self.cache.ttl_for(endpoint, kwargs.get('params'))) is not None:
+            return await self._cached_get(key, ttl, endpoint, raise_for_status, hedge, **kwargs)
+
+        return await self.single_flight.do(
+            key,
+            lambda: self.request("GET", endpoint, raise_for_status=raise_for_status, hedge=hedge, **kwargs)
+        )
+
+    async def load(self, family: str, record_id: t.Union[int, str]) -> t.Dict:
+        """
+        Return the record with ID `record_id` of the list endpoint `family`, like a GET of `family/record_id`.
+
+        Records which aren't cached are looked up in batches with the other lookups made at about
+        the same time. The result is shared, so it must be treated as read-only.
+        """
+        endpoint = f'{family}/{record_id}'
+
+        if self.cache is not None and (entry := self.cache.get(request_key(endpoint, True, dict()))) and entry.fresh:
+            return await self.get(endpoint)
+
+        if (loader := self.loaders.get(family)) is None:
+            loader = self.loaders[family] = BatchLoader(self, family, self.loader_config)
+
+        return await loader.load(record_id)
+
+    @asynccontextmanager
+    async def _stream(self, endpoint: str, **kwargs) -> t.AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Send a GET request and yield the response without reading its body.
+
+        The request is retried like `_request` until a response is yielded, but not once its body is
+        being read. Each attempt is recorded by the circuit breaker and the metrics, and holds its
+        scheduler slot until it's done, i.e. until the context is left for the yielded response.
+        """
+        await self.ready.wait()
+
+        breaker = self.breakers[endpoint]
+        timeout = kwargs.pop('timeout', self.pool_config.create_stream_timeout())
+
+        for attempt in itertools.count():
+            breaker.before_request()
+            delay = None
+
+            async with self.scheduler.slot():
+                started = time.perf_counter()
+                status, response_size, streaming = None, 0, False
+
+                try:
+                    async with self.session.get(self.endpoint_url(endpoint), timeout=timeout, **kwargs) as resp:
+                        status = resp.status
+                        breaker.record(resp.status)
+
+                        if self.retry_policy.should_retry('GET', attempt, resp.status):
+                            delay = self.retry_policy.delay(attempt, resp.headers.get('Retry-After'))
+
+                        if delay is not None:
+                            log.debug(f'GET {endpoint} responded with {resp.status}, retrying in {delay:.2f}s.')
+                        else:
+                            try:
+                                if resp.status >= 400:
+                                    error_response = APIResponse(resp, resp.status, resp.headers, await resp.read())
+                                    self.maybe_raise_for_status(error_response, True)
+
+                                streaming = True
+                                yield resp
+                                return
+
+                            finally:
+                                response_size = getattr(resp.content, 'total_bytes', 0)
+                                self.compressor.record_response(resp.headers, response_size)
+
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as err:
+                    breaker.record(None)
+
+                    if streaming or not self.retry_policy.should_retry('GET', attempt):
+                        raise
+
+                    delay = self.retry_policy.delay(attempt)
+                    log.debug(f'GET {endpoint} failed with {err!r}, retrying in {delay:.2f}s.')
+
+                finally:
+                    self.metrics.record('GET', endpoint, status, time.perf_counter() - started, 0, response_size)
+
+            await asyncio.sleep(delay)
+
+    async def iter_pages(
+        self,
+        endpoint: str,
+        page_size: int = 1000,
+        params: t.Optional[t.Dict] = None
+    ) -> t.AsyncIterator[t.List[t.Dict]]:
+        """
+        Iterate over the records of a list endpoint in pages of up to `page_size` records.
+
+        Paginated endpoints, which answer with a `results` list and a `next` link, are requested
+        page by page with `limit` and `offset`. Otherwise the response is streamed and its JSON
+        array is parsed as it arrives, so the whole list is never decoded at once.
+        """
+        params = {**(params or dict()), 'limit': page_size}
+        parser = JSONArrayParser(self.codec.loads)
+        page = list()
+
+        async with self._stream(endpoint, params=params) as resp:
+            async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                page.extend(parser.feed(chunk))
+
+                while len(page) >= page_size:
+                    yield page[:page_size]
+                    del page[:page_size]
+
+            page.extend(parser.feed(b'', final=True))
+
+        if page:
+            yield page
+
+        if (document := parser.document) is None:
+            return
+
+        offset = 0
+        while True:
+            if not isinstance(results := document.get('results'), list):
+                raise ValueError(f'`{endpoint}` is not a list endpoint.')
+
+            for start in range(0, len(results), page_size):
+                yield results[start:start + page_size]
+
+            if not results or not document.get('next'):
+                return
+
+            offset += len(results)
+            document = await self.request('GET', endpoint, params={**params, 'offset': offset})
+
+    async def _write_one(self, method: str, endpoint: str, record: t.Dict) -> None:
+        """Write a single record: POSTs go to `endpoint`, anything else to `endpoint/id`."""
+        async with self.write_limiter.slot():
+            if method == 'POST':
+                await self.request(method, endpoint, json=record)
+            elif method == 'DELETE':
+                await self.request(method, f'{endpoint}/{record["id"]}')
+            else:
+                await self.request(method, f'{endpoint}/{record["id"]}', json=record)
+
+    async def _write_each(self, method: str, endpoint: str, records: t.Sequence[t.Dict]) -> BulkResult:
+        """Write `records` one request per record, as many at once as the write limiter allows."""
+        results = await asyncio.gather(
+            *(self._write_one(method, endpoint, record) for record in records),
+            return_exceptions=True
+        )
+
+        succeeded, failed = 0, list()
+        for record, result in zip(records, results):
+            if isinstance(result, ResponseCodeError):
+                failed.append((record, result))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                succeeded += 1
+
+        return BulkResult(succeeded, failed)
+
+    async def _write_chunk(
+        self,
+        method: str,
+        endpoint: str,
+        chunk: t.List[t.Dict],
+        body: bytes,
+        headers: t.Dict[str, str]
+    ) -> BulkResult:
+        """
+        Write `chunk` to the bulk endpoint, falling back to one request per record where needed.
+
+        Until the bulk endpoint has answered once, only one chunk is sent to it at a time, so the
+        other chunks aren't all sent to a bulk endpoint which doesn't exist.
+        """
+        try:
+            result, sent = None, False
+            if endpoint not in self.bulk_probed:
+                if (lock := self.bulk_probes.get(endpoint)) is None:
+                    lock = self.bulk_probes[endpoint] = asyncio.Lock()
+
+                async with lock:
+                    if endpoint not in self.bulk_probed:
+                        result, sent = await self._write_bulk(method, endpoint, chunk, body, headers), True
+
+            if not sent and endpoint not in self.bulk_unsupported:
+                result = await self._write_bulk(method, endpoint, chunk, body, headers)
+
+            return result or await self._write_each(method, endpoint, chunk)
+
+        finally:
+            if self.cache is not None:
+                for record in chunk:
+                    self.cache.invalidate(endpoint, record.get('id'))
+
+    async def _write_bulk(
+        self,
+        method: str,
+        endpoint: str,
+        chunk: t.List[t.Dict],
+        body: bytes,
+        headers: t.Dict[str, str]
+    ) -> t.Optional[BulkResult]:
+        """Send `chunk` to the bulk endpoint, returning None if its records must be written one by one instead."""
+        try:
+            async with self.write_limiter.slot():
+                await self.request(method, f'{endpoint}/bulk', data=body, headers=headers)
+
+        except ResponseCodeError as err:
+            if not 400 <= err.status < 500:
+                return BulkResult(0, [(record, err) for record in chunk])
+
+            if err.status != 429:
+                self.bulk_probed.add(endpoint)
+
+            if err.status in (404, 405):
+                log.info(f'The Snek API has no bulk endpoint for `{endpoint}`, writing records one by one.')
+                self.bulk_unsupported.add(endpoint)
+
+            return None
+
+        self.bulk_probed.add(endpoint)
+        return BulkResult(len(chunk), list())
+
+    async def bulk(
+        self,
+        method: str,
+        endpoint: str,
+        records: t.Sequence[t.Dict],
+        max_records: int = BULK_MAX_RECORDS,
+        max_bytes: int = BULK_MAX_BYTES
+    ) -> BulkResult:
+        """
+        Write `records` to the list endpoint `endpoint` with as few requests as possible.
+
+        Records are sent to `endpoint/bulk` as JSON arrays, chunked by `max_records` and `max_bytes`.
+        A chunk rejected with a client error is retried record by record to isolate the bad ones.
+        If the API has no bulk endpoint, each record is written on its own instead, and this is
+        remembered for the endpoint. Chunks and single records are written concurrently, bounded
+        by the adaptive write limiter of the client. Failed records don't stop the others; they
+        are returned in the result along with their errors. Any other error cancels the writes
+        still in flight before it's raised.
+        """
+        method = method.upper()
+        endpoint = endpoint.strip('/')
+
+        if not records:
+            return BulkResult(0, list())
+
+        if endpoint in self.bulk_unsupported:
+            return await self._write_each(method, endpoint, records)
+
+        encoded = [self.codec.dumps(record) for record in records]
+        headers = {'Content-Type': self.codec.content_type}
+
+        results = await gather_writes(*(
+            self._write_chunk(method, endpoint, chunk, body, headers)
+            for chunk, body in chunk_records(records, encoded, max_records, max_bytes)
+        ))
+
+        return BulkResult(
+            sum(result.succeeded for result in results),
+            [failure for result in results for failure in result.failed]
+        )
+
+    async def upsert(
+        self,
+        endpoint: str,
+        record_id: int,
+        payload: t.Dict,
+        exists: t.Optional[bool] = None
+    ) -> t.Dict:
+        """
+        Create or update the record `record_id` of the list endpoint `endpoint` with `payload`.
+
+        If the API upserts on PUT, that is all it takes. Otherwise the record is updated with a PUT
+        if it's expected to exist, or created with a POST if `exists` is False. Should that guess
+        be wrong, i.e. the PUT responds with 404 or the POST with 400, the other one is sent.
+        """
+        endpoint = endpoint.strip('/')
+
+        if self.upsert_supported or exists is not False:
+            try:
+                return await self.put(f'{endpoint}/{record_id}', json=payload)
+
+            except ResponseCodeError as err:
+                if err.status != 404:
+                    raise
+
+                if self.upsert_supported:
+                    log.info('The Snek API does not create records on PUT, upserting with POST instead.')
+                    self.upsert_supported = False
+
+            return await self.post(endpoint, json=payload)
+
+        try:
+            return await self.post(endpoint, json=payload)
+
+        except ResponseCodeError as err:
+            if err.status != 400:
+                raise
+
+            log.debug(f'Creating {endpoint}/{record_id} failed with 400, updating it instead.')
+            return await self.put(f'{endpoint}/{record_id}', json=payload)
+
+    async def post(self, endpoint: str, raise_for_status: bool = True, **kwargs) -> t.Dict:
+        """Snek API POST request."""
+        return await self.request("POST", endpoint, raise_for_status=raise_for_status, **kwargs)
+
+    async def put(self, endpoint: str, raise_for_status: bool = True, **kwargs) -> t.Dict:
+        """Snek API PUT request."""
+        return await self.request("PUT", endpoint, raise_for_status=raise_for_status, **kwargs)
+
+    async def patch(self, endpoint: str, raise_for_status: bool = True, **kwargs) -> t.Dict:
+        """Snek API PATCH request."""
+        return await self.request("PATCH", endpoint, raise_for_status=raise_for_status, **kwargs)
+
+    async def delete(self, endpoint: str, raise_for_status: bool = True, **kwargs) -> t.Optional[t.Dict]:
+        """Snek API DELETE request."""
+        return await self.request("DELETE", endpoint, raise_for_status=raise_for_status, **kwargs)
@@ -0,0 +1,57 @@
+import json
+import logging
+import os
+import typing as t
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+
+class JSONCodec:
+    """Encode request bodies and decode response bodies with the standard library's `json` module."""
+
+    name = 'json'
+    content_type = 'application/json'
+
+    def dumps(self, obj: t.Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    def loads(self, data: t.Union[bytes, str]) -> t.Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """Encode and decode JSON with `orjson`, which is several times faster than the standard library."""
+
+    name = 'orjson'
+
+    def dumps(self, obj: t.Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data: t.Union[bytes, str]) -> t.Any:
+        return orjson.loads(data)
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec, OrjsonCodec)}
+
+
+def default_codec() -> JSONCodec:
+    """
+    Return the codec named by `SNEK_API_JSON_CODEC`, or the fastest installed codec if not set.
+
+    `orjson` is an optional dependency; the standard library is used when it isn't installed.
+    """
+    if (name := os.environ.get('SNEK_API_JSON_CODEC')) is not None:
+        if name not in CODECS:
+            raise ValueError(f'Unknown JSON codec `{name}`, expected one of: {", ".join(CODECS)}.')
+
+        if name == OrjsonCodec.name and orjson is None:
+            raise ValueError('The `orjson` JSON codec was requested but orjson is not installed.')
+
+        return CODECS[name]()
+
+    return OrjsonCodec() if orjson is not None else JSONCodec()
@@ -0,0 +1,136 @@
+import asyncio
+from collections import namedtuple
+import gzip
+import logging
+import typing as t
+
+from snek.api.config import from_env
+
+log = logging.getLogger(__name__)
+
+CompressionStats = namedtuple(
+    'CompressionStats',
+    (
+        'compressed_requests', 'request_bytes', 'request_bytes_sent',
+        'compressed_responses', 'response_bytes', 'response_bytes_received'
+    )
+)
+
+COMPRESSED_ENCODINGS = frozenset(('gzip', 'deflate', 'br'))
+
+# Bodies at least this large are compressed in a thread so the event loop isn't blocked
+EXECUTOR_THRESHOLD = 256 * 1024
+
+
+class CompressionConfig(t.NamedTuple):
+    """
+    Compression of request bodies sent to the Snek API.
+
+    Bodies of at least `compress_threshold` bytes are sent gzipped when `compress_requests`
+    is enabled. Responses are always negotiated through `Accept-Encoding`, which aiohttp
+    sends and decodes by itself.
+    """
+
+    compress_requests: bool = False
+    compress_threshold: int = 16 * 1024
+    compress_level: int = 5
+
+    @classmethod
+    def from_env(cls) -> 'CompressionConfig':
+        """Create a config from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+
+class Compressor:
+    """Compress request bodies and count the bytes compression saved in either direction."""
+
+    def __init__(self, config: CompressionConfig) -> None:
+        self.config = config
+        self.enabled = config.compress_requests
+
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the byte counters."""
+        self.compressed_requests = 0
+        self.request_bytes = 0
+        self.request_bytes_sent = 0
+
+        self.compressed_responses = 0
+        self.response_bytes = 0
+        self.response_bytes_received = 0
+
+    @property
+    def stats(self) -> CompressionStats:
+        return CompressionStats(
+            compressed_requests=self.compressed_requests,
+            request_bytes=self.request_bytes,
+            request_bytes_sent=self.request_bytes_sent,
+            compressed_responses=self.compressed_responses,
+            response_bytes=self.response_bytes,
+            response_bytes_received=self.response_bytes_received
+        )
+
+    @property
+    def bytes_saved(self) -> int:
+        return (
+            self.request_bytes - self.request_bytes_sent
+            + self.response_bytes - self.response_bytes_received
+        )
+
+    def reject(self, body: bytes, compressed: bytes) -> None:
+        """Stop compressing request bodies because the Snek API rejected `compressed`, which was `body` gzipped."""
+        if self.enabled:
+            log.info('The Snek API does not accept compressed request bodies, sending them uncompressed.')
+            self.enabled = False
+
+        self.compressed_requests -= 1
+        self.request_bytes -= len(body)
+        self.request_bytes_sent -= len(compressed)
+
+    async def compress(self, body: bytes) -> t.Optional[bytes]:
+        """Return `body` gzipped if it should be compressed and it got smaller, otherwise None."""
+        if not self.enabled or len(body) < self.config.compress_threshold:
+            return None
+
+        if len(body) >= EXECUTOR_THRESHOLD:
+            compressed = await asyncio.get_event_loop().run_in_executor(
+                None, gzip.compress, body, self.config.compress_level
+            )
+        else:
+            compressed = gzip.compress(body, self.config.compress_level)
+
+        if len(compressed) >= len(body):
+            return None
+
+        self.compressed_requests += 1
+        self.request_bytes += len(body)
+        self.request_bytes_sent += len(compressed)
+
+        return compressed
+
+    def record_response(self, headers: t.Mapping[str, str], size: int) -> None:
+        """
+        Count a response body of `size` decoded bytes.
+
+        Only responses with a compressed `Content-Encoding` and a `Content-Length`
+        are counted, as the size on the wire isn't known otherwise.
+        """
+        if headers.get('Content-Encoding') not in COMPRESSED_ENCODINGS:
+            return
+
+        if not (content_length := headers.get('Content-Length', '')).isdigit():
+            return
+
+        self.compressed_responses += 1
+        self.response_bytes += size
+        self.response_bytes_received += int(content_length)
+
+    def summary(self) -> str:
+        """Describe the bytes saved by compression."""
+        return (
+            f'Compression saved {self.bytes_saved:,} bytes: '
+            f'{self.compressed_requests} requests sent {self.request_bytes_sent:,}/{self.request_bytes:,} bytes, '
+            f'{self.compressed_responses} responses received {self.response_bytes_received:,}/'
+            f'{self.response_bytes:,} bytes'
+        )
@@ -0,0 +1,28 @@
+import os
+import typing as t
+
+T = t.TypeVar('T', bound=tuple)
+
+
+def from_env(cls: t.Type[T], prefix: str = 'SNEK_API_') -> T:
+    """
+    Create an instance of the `NamedTuple` config `cls` from the environment.
+
+    Every field can be overridden by an upper-cased environment variable with the
+    given `prefix`, e.g. `SNEK_API_LIMIT_PER_HOST=50`. Values are converted to the
+    type of the field's default, where booleans accept `1`, `true`, `yes` and `on`.
+    Unset fields keep their default.
+    """
+    defaults = cls()
+    values = dict()
+
+    for field in cls._fields:
+        if (value := os.environ.get(f'{prefix}{field.upper()}')) is None:
+            continue
+
+        if isinstance(default := getattr(defaults, field), bool):
+            values[field] = value.lower() in ('1', 'true', 'yes', 'on')
+        else:
+            values[field] = type(default)(value)
+
+    return cls(**values)
@@ -0,0 +1,31 @@
+import typing as t
+
+
+def endpoint_family(endpoint: str) -> str:
+    """Return the family of `endpoint`, which is its first path segment (e.g. `users` for `users/1234`)."""
+    return endpoint.strip('/').split('/', maxsplit=1)[0]
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Return `endpoint` with its ID segments replaced by `{id}` (e.g. `users/{id}` for `users/1234`)."""
+    return '/'.join('{id}' if segment.isdigit() else segment for segment in endpoint.strip('/').split('/'))
+
+
+def request_key(endpoint: str, raise_for_status: bool, kwargs: t.Dict[str, t.Any]) -> t.Optional[t.Hashable]:
+    """
+    Return a key identifying a GET request, or None if the request can't be safely identified.
+
+    Only requests with no other keyword arguments than `params` are given a key, since
+    anything else (e.g. custom headers) could change the response.
+    """
+    if kwargs.keys() - {'params'}:
+        return None
+
+    params = kwargs.get('params') or ()
+    if isinstance(params, t.Mapping):
+        params = params.items()
+
+    try:
+        return endpoint.strip('/'), raise_for_status, tuple(sorted((str(k), str(v)) for k, v in params))
+    except (TypeError, ValueError):
+        return None
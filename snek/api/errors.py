@@ -0,0 +1,49 @@
+import typing as t
+
+import aiohttp
+
+
+class ResponseCodeError(ValueError):
+    """Raised when a non-ok HTTP status code is received."""
+
+    def __init__(
+        self,
+        response: aiohttp.ClientResponse,
+        response_json: t.Optional[t.Dict] = None,
+        response_text: str = ''
+    ):
+        self.response = response
+        self.status = response.status
+
+        self.response_json = response_json or dict()
+        self.response_text = response_text
+
+    def __str__(self) -> str:
+        return f'Status: {self.status} Response: {self.response_json or self.response_text}'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker of its endpoint family is open."""
+
+    def __init__(self, family: str, retry_after: float):
+        self.family = family
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        return f'The Snek API is unavailable for `{self.family}`, retrying in {self.retry_after:.0f}s.'
+
+
+class BulkWriteError(Exception):
+    """Raised when some records of a bulk write could not be written."""
+
+    def __init__(self, endpoint: str, succeeded: int, failed: t.List[t.Tuple[t.Dict, Exception]]):
+        self.endpoint = endpoint
+        self.succeeded = succeeded
+        self.failed = failed
+
+    def __str__(self) -> str:
+        record, error = self.failed[0]
+        return (
+            f'{len(self.failed)}/{self.succeeded + len(self.failed)} records failed to be written to '
+            f'`{self.endpoint}`, e.g. {record.get("id")}: {error}'
+        )
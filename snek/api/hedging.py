@@ -0,0 +1,80 @@
+from collections import deque
+import typing as t
+
+from snek.api.config import from_env
+from snek.api.endpoints import endpoint_template
+
+
+class HedgeConfig(t.NamedTuple):
+    """
+    Hedging of slow GET requests.
+
+    A hedged GET sends a second request once the first has taken longer than the
+    `hedge_quantile` of the last `hedge_window` latencies of its endpoint, clamped between
+    `hedge_min_delay` and `hedge_max_delay`. Endpoints with fewer than `hedge_min_samples`
+    latencies aren't hedged. Each hedgeable request adds `hedge_budget` to a budget of at
+    most `hedge_max_tokens` hedges, so no more than that fraction of them is ever hedged.
+    """
+
+    hedge_quantile: float = 0.95
+    hedge_window: int = 200
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 0.02
+    hedge_max_delay: float = 2.0
+    hedge_budget: float = 0.05
+    hedge_max_tokens: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> 'HedgeConfig':
+        """Create a config from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+
+class HedgePolicy:
+    """Decide when to hedge a GET from recent latencies of its endpoint and the hedging budget."""
+
+    def __init__(self, config: HedgeConfig) -> None:
+        self.config = config
+
+        self.latencies: t.Dict[str, t.Deque[float]] = dict()
+        self.tokens = 0.0
+
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        """Add the latency of a successful GET of `endpoint`."""
+        template = endpoint_template(endpoint)
+
+        if (latencies := self.latencies.get(template)) is None:
+            latencies = self.latencies[template] = deque(maxlen=self.config.hedge_window)
+
+        latencies.append(latency)
+
+    def delay(self, endpoint: str) -> t.Optional[float]:
+        """
+        Return the seconds after which a GET of `endpoint` should be hedged, or None if it can't be.
+
+        Every call adds to the budget, since it's made once per hedgeable request.
+        """
+        self.tokens = min(self.config.hedge_max_tokens, self.tokens + self.config.hedge_budget)
+
+        latencies = self.latencies.get(endpoint_template(endpoint), ())
+        if len(latencies) < self.config.hedge_min_samples:
+            return None
+
+        threshold = sorted(latencies)[min(len(latencies) - 1, int(self.config.hedge_quantile * len(latencies)))]
+        return min(self.config.hedge_max_delay, max(self.config.hedge_min_delay, threshold))
+
+    def acquire(self) -> bool:
+        """Take a hedge from the budget, returning whether there was one left."""
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        self.hedged += 1
+        return True
+
+    def summary(self) -> str:
+        """Describe how many requests were hedged and how often the hedge answered first."""
+        return f'Hedged {self.hedged} GETs, of which the hedge answered first {self.hedge_wins} times'
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import typing as t
+
+from snek.api.config import from_env
+from snek.api.endpoints import request_key
+from snek.api.errors import ResponseCodeError
+from snek.api.scheduler import current_priority, Priority, request_priority
+
+if t.TYPE_CHECKING:
+    from snek.api.client import APIClient
+
+log = logging.getLogger(__name__)
+
+
+class LoaderConfig(t.NamedTuple):
+    """
+    Batching of record lookups by ID.
+
+    Lookups made within `batch_window` seconds of the first one are sent together,
+    in batches of up to `batch_max_size` IDs.
+    """
+
+    batch_enabled: bool = True
+    batch_window: float = 0.002
+    batch_max_size: int = 100
+
+    @classmethod
+    def from_env(cls) -> 'LoaderConfig':
+        """Create a config from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+
+class Batch:
+    """The lookups collected within a batch window, by record ID."""
+
+    __slots__ = ('futures', 'priority', 'handle')
+
+    def __init__(self) -> None:
+        self.futures: t.Dict[str, asyncio.Future] = dict()
+        self.priority = Priority.BACKGROUND
+        self.handle: t.Optional[asyncio.TimerHandle] = None
+
+
+class BatchLoader:
+    """
+    Look up records of the list endpoint `family` by ID, batching concurrent lookups.
+
+    A batch is requested with a single `family?id__in=...` query. If the endpoint rejects the
+    filter with a 400, or answers with records that weren't asked for because it ignores the
+    filter, batching is turned off for the endpoint and records are requested one by one.
+    Until the first batch tells which it is, the other batches wait for it, so an endpoint
+    which ignores the filter isn't listed in full once per batch.
+    IDs missing from a batch response are requested on their own as well, so a lookup of
+    an unknown ID still raises the usual 404 `ResponseCodeError`.
+    """
+
+    def __init__(self, client: 'APIClient', family: str, config: LoaderConfig) -> None:
+        self.client = client
+        self.family = family
+        self.config = config
+
+        self.batch: t.Optional[Batch] = None
+        self.supported = config.batch_enabled
+
+        # Whether a batch was answered, telling if the endpoint filters by IDs. Held by the batch finding out.
+        self.probed = False
+        self.probe_lock = asyncio.Lock()
+
+        self.loads = 0
+        self.batches = 0
+
+    async def load(self, record_id: t.Union[int, str]) -> t.Dict:
+        """Return the record with ID `record_id`. The record is shared and must be treated as read-only."""
+        self.loads += 1
+
+        if not self.supported:
+            return await self.client.get(f'{self.family}/{record_id}')
+
+        if (batch := self.batch) is None:
+            batch = self.batch = Batch()
+            batch.handle = self.client.loop.call_later(self.config.batch_window, self._dispatch)
+
+        batch.priority = min(batch.priority, current_priority.get())
+
+        if (future := batch.futures.get(str(record_id))) is None:
+            future = batch.futures[str(record_id)] = self.client.loop.create_future()
+
+            if len(batch.futures) >= self.config.batch_max_size:
+                batch.handle.cancel()
+                self._dispatch()
+
+        # Shield the lookup so a cancelled caller doesn't cancel it for the others
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        batch, self.batch = self.batch, None
+        self.batches += 1
+
+        with request_priority(batch.priority):
+            self.client.loop.create_task(self._resolve(batch.futures))
+
+    async def _resolve(self, futures: t.Dict[str, asyncio.Future]) -> None:
+        """Request the records of `futures` and set them as their results."""
+        remaining = dict(futures)
+
+        if len(futures) > 1 and self.supported:
+            try:
+                records = await self._fetch_batch(list(futures))
+
+            except Exception as err:
+                for future in futures.values():
+                    self._settle(future, error=err)
+                return
+
+            for record_id, record in (records or dict()).items():
+                self._settle(remaining.pop(record_id), result=record)
+
+        await asyncio.gather(*(self._fetch_one(record_id, future) for record_id, future in remaining.items()))
+
+    async def _fetch_batch(self, record_ids: t.List[str]) -> t.Optional[t.Dict[str, t.Dict]]:
+        """Like `_fetch_many`, but only one batch is sent until the endpoint is known to filter by IDs."""
+        if not self.probed:
+            async with self.probe_lock:
+                if not self.probed:
+                    records = await self._fetch_many(record_ids)
+                    self.probed = True
+                    return records
+
+        return await self._fetch_many(record_ids) if self.supported else None
+
+    async def _fetch_many(self, record_ids: t.List[str]) -> t.Optional[t.Dict[str, t.Dict]]:
+        """
+        Return the records found for `record_ids` by ID, or None if the endpoint can't filter by IDs.
+
+        The batch query itself isn't cached, but the records it returns are cached like single GETs.
+        """
+        cache = self.client.cache
+        version = cache.version(self.family) if cache is not None else None
+
+        try:
+            response = await self.client.request('GET', self.family, params={'id__in': ','.join(record_ids)})
+
+        except ResponseCodeError as err:
+            if err.status != 400:
+                raise
+
+            return self._unsupported(f'rejected the `id__in` filter with {err.status}')
+
+        if isinstance(response, dict):
+            response = response.get('results')
+
+        if not isinstance(response, list):
+            return self._unsupported('did not answer with a list')
+
+        records = {str(record.get('id')): record for record in response if isinstance(record, dict)}
+
+        if len(records) != len(response) or records.keys() - set(record_ids):
+            return self._unsupported('answered with records which were not requested')
+
+        if cache is not None and (ttl := cache.ttl_for(f'{self.family}/{{id}}', None)) is not None:
+            for record_id, record in records.items():
+                endpoint = f'{self.family}/{record_id}'
+                size = len(self.client.codec.dumps(record))
+                cache.store(request_key(endpoint, True, dict()), endpoint, size, ttl, version, data=record)
+
+        return records
+
+    async def _fetch_one(self, record_id: str, future: asyncio.Future) -> None:
+        try:
+            self._settle(future, result=await self.client.get(f'{self.family}/{record_id}'))
+        except Exception as err:
+            self._settle(future, error=err)
+
+    def _unsupported(self, reason: str) -> None:
+        if self.supported:
+            log.info(f'Looking up `{self.family}` by ID one at a time, as the Snek API {reason}.')
+            self.supported = False
+
+    @staticmethod
+    def _settle(future: asyncio.Future, result: t.Any = None, error: t.Optional[BaseException] = None) -> None:
+        if future.done():
+            return
+
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+            # Mark the exception as retrieved in case every caller was cancelled
+            future.add_done_callback(lambda f: f.exception())
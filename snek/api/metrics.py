@@ -0,0 +1,118 @@
+import bisect
+from collections import Counter
+import math
+import typing as t
+
+from snek.api.endpoints import endpoint_template
+
+# Upper bounds of the histogram buckets; the last bucket catches everything above
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, math.inf)
+
+
+class Histogram:
+    """A fixed-bucket histogram of observed values."""
+
+    def __init__(self, buckets: t.Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate the `q` quantile by interpolating linearly within its bucket."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = min(self.buckets[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+
+            seen += count
+
+        return self.max
+
+
+class EndpointMetrics:
+    """Latency, status and payload size statistics of one endpoint template and method."""
+
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_size = Histogram(SIZE_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.statuses: t.Counter[t.Optional[int]] = Counter()
+
+
+class APIMetrics:
+    """
+    Request metrics of the API client, keyed by method and endpoint template.
+
+    Endpoints are reduced to templates such as `users/{id}` so IDs don't create a
+    new set of metrics per resource.
+    """
+
+    def __init__(self) -> None:
+        self.endpoints: t.Dict[t.Tuple[str, str], EndpointMetrics] = dict()
+
+    def record(
+        self,
+        method: str,
+        endpoint: str,
+        status: t.Optional[int],
+        latency: float,
+        request_size: int = 0,
+        response_size: int = 0
+    ) -> None:
+        """Record a request. A `status` of None means it failed without a response."""
+        key = method, endpoint_template(endpoint)
+
+        if (metrics := self.endpoints.get(key)) is None:
+            metrics = self.endpoints[key] = EndpointMetrics()
+
+        metrics.latency.observe(latency)
+        metrics.request_size.observe(request_size)
+        metrics.response_size.observe(response_size)
+        metrics.statuses[status] += 1
+
+    def reset(self) -> None:
+        self.endpoints.clear()
+
+    def summary(self) -> t.List[str]:
+        """Return a line per endpoint, sorted by the total time spent on it."""
+        lines = list()
+        endpoints = sorted(self.endpoints.items(), key=lambda item: item[1].latency.total, reverse=True)
+
+        for (method, template), metrics in endpoints:
+            latency = metrics.latency
+            statuses = ', '.join(
+                f'{status or "error"}: {count}'
+                for status, count in sorted(metrics.statuses.items(), key=lambda item: item[0] or 0)
+            )
+
+            lines.append(
+                f'{method} {template} - {latency.count} requests\n'
+                f'  latency p50 {latency.quantile(0.5) * 1000:.0f}ms, p95 {latency.quantile(0.95) * 1000:.0f}ms, '
+                f'p99 {latency.quantile(0.99) * 1000:.0f}ms, max {latency.max * 1000:.0f}ms\n'
+                f'  bytes out {metrics.request_size.total:,.0f}, in {metrics.response_size.total:,.0f} '
+                f'(mean {metrics.response_size.mean:,.0f})\n'
+                f'  statuses {statuses}'
+            )
+
+        return lines
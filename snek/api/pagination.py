@@ -0,0 +1,137 @@
+import json
+import re
+import typing as t
+
+# Whitespace and commas between the items of an array
+SEPARATORS = re.compile(rb'[ \t\r\n,]*')
+# What changes the nesting within an item: a string, whose brackets don't count, or a bracket.
+# A string cut off by the end of the buffer matches without its closing quote.
+TOKENS = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*(?P<closed>")?|[\[\]{}]', re.DOTALL)
+# The end of a number or literal
+SCALAR_END = re.compile(rb'[ \t\r\n,\]]')
+
+# How many closing brackets are tried as the end of the last complete item before scanning for it
+PREFIX_GUESSES = 3
+
+
+class JSONArrayParser:
+    """
+    Incrementally parse the items of a JSON array which arrives in chunks.
+
+    The items completed by each chunk are decoded together with `loads`, e.g. the codec of the
+    API client, so only their boundaries are looked for here. If the document turns out to
+    be an object instead (e.g. a paginated response), it is buffered and decoded with `loads` into
+    `document` once the last chunk is fed.
+    """
+
+    def __init__(self, loads: t.Callable[[bytes], t.Any] = json.loads) -> None:
+        self.loads = loads
+
+        self.buffer = b''
+        self.started = False
+        self.finished = False
+
+        self.is_object = False
+        self.document: t.Optional[t.Dict] = None
+
+    def decode_prefix(self, buffer: bytes, start: int) -> t.Optional[t.Tuple[int, t.List[t.Any]]]:
+        """
+        Guess where the last complete item from `start` ends, and return that end with the items up to it.
+
+        Items of list endpoints are objects, so the last one completed usually ends with the last
+        closing bracket of the buffer. The guess is checked by decoding the items up to it as an
+        array, which only succeeds if it's the end of an item. Earlier closing brackets are tried
+        a few times if it isn't, e.g. for a bracket within the last item. None is returned if no
+        guess is right, leaving the items to be scanned for one by one.
+        """
+        end = len(buffer)
+        for _ in range(PREFIX_GUESSES):
+            if (guess := max(buffer.rfind(b'}', start, end), buffer.rfind(b']', start, end))) < 0:
+                return None
+
+            try:
+                return guess + 1, self.loads(b'[' + buffer[start:guess + 1] + b']')
+            except ValueError:
+                end = guess
+
+        return None
+
+    @staticmethod
+    def item_end(buffer: bytes, pos: int, final: bool) -> t.Optional[int]:
+        """Return where the item starting at `pos` ends, or None if it isn't complete in `buffer` yet."""
+        if buffer[pos] not in b'[{"':
+            if (match := SCALAR_END.search(buffer, pos)) is not None:
+                return match.start()
+
+            # A number or literal at the end of the buffer could still continue in the next chunk
+            return len(buffer) if final else None
+
+        depth = 0
+        for token in TOKENS.finditer(buffer, pos):
+            if (text := token.group()) in (b'[', b'{'):
+                depth += 1
+            elif text in (b']', b'}'):
+                depth -= 1
+            elif token['closed'] is None:
+                return None
+
+            if depth == 0:
+                return token.end()
+
+        return None
+
+    def feed(self, chunk: bytes, final: bool = False) -> t.List[t.Any]:
+        """Add `chunk` to the document and return the array items it completed."""
+        buffer = self.buffer = self.buffer + chunk
+
+        if self.is_object:
+            if final:
+                self.document = self.loads(buffer)
+            return []
+
+        pos = SEPARATORS.match(buffer).end()
+
+        if not self.started:
+            if pos == len(buffer):
+                if final:
+                    raise ValueError('Expected a JSON array or object, got nothing.')
+                return []
+
+            if buffer[pos:pos + 1] == b'{':
+                self.is_object = True
+                return self.feed(b'', final)
+
+            if buffer[pos:pos + 1] != b'[':
+                raise ValueError(f'Expected a JSON array or object, got {buffer[pos:pos + 1]!r}.')
+
+            self.started = True
+            pos = SEPARATORS.match(buffer, pos + 1).end()
+
+        items = list()
+        if not self.finished and (guess := self.decode_prefix(buffer, pos)) is not None:
+            end, items = guess
+            pos = SEPARATORS.match(buffer, end).end()
+
+        # Whatever the guess left, usually the start of an item which the next chunk completes
+        start = end = pos
+        while not self.finished and pos < len(buffer):
+            if buffer[pos:pos + 1] == b']':
+                self.finished = True
+                pos += 1
+                break
+
+            if (item_end := self.item_end(buffer, pos, final)) is None:
+                break
+
+            end = item_end
+            pos = SEPARATORS.match(buffer, end).end()
+
+        self.buffer = buffer[pos:]
+
+        if final and not self.finished:
+            raise ValueError('The JSON array ended unexpectedly.')
+
+        if end > start:
+            items.extend(self.loads(b'[' + buffer[start:end] + b']'))
+
+        return items
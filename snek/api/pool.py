@@ -0,0 +1,139 @@
+from collections import namedtuple
+import logging
+import time
+import typing as t
+
+import aiohttp
+
+from snek.api.config import from_env
+
+log = logging.getLogger(__name__)
+
+UNIX_SCHEME = 'unix://'
+
+PoolStats = namedtuple(
+    'PoolStats',
+    ('in_use', 'idle', 'waiting', 'limit', 'limit_per_host', 'created', 'reused', 'waits', 'wait_time')
+)
+
+
+class PoolConfig(t.NamedTuple):
+    """Connection pool, keep-alive and timeout settings for the Snek API session."""
+
+    limit: int = 100
+    limit_per_host: int = 30
+    keepalive_timeout: float = 30.0
+    dns_cache_ttl: int = 300
+    total_timeout: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 15.0
+    warm_connections: int = 4
+
+    @classmethod
+    def from_env(cls) -> 'PoolConfig':
+        """Create a config from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+    def create_connector(self, socket_path: t.Optional[str] = None) -> aiohttp.BaseConnector:
+        """
+        Create a pooled TCP connector, or a Unix domain socket connector to `socket_path` if given.
+
+        A DNS cache TTL of 0 disables the DNS cache of the TCP connector.
+        """
+        if socket_path is not None:
+            return aiohttp.UnixConnector(
+                socket_path,
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=self.dns_cache_ttl > 0,
+            ttl_dns_cache=self.dns_cache_ttl or None
+        )
+
+    def create_timeout(self) -> aiohttp.ClientTimeout:
+        """Create the total/connect/read timeouts. A timeout of 0 disables it."""
+        return aiohttp.ClientTimeout(
+            total=self.total_timeout or None,
+            connect=self.connect_timeout or None,
+            sock_read=self.read_timeout or None
+        )
+
+    def create_stream_timeout(self) -> aiohttp.ClientTimeout:
+        """
+        Create the timeouts of streamed responses, which have no total timeout.
+
+        A streamed body is read as fast as it's consumed, e.g. while each page is diffed, so only
+        connecting and each read are bounded.
+        """
+        return aiohttp.ClientTimeout(
+            total=None,
+            connect=self.connect_timeout or None,
+            sock_read=self.read_timeout or None
+        )
+
+
+def parse_site_url(site_url: str) -> t.Tuple[str, t.Optional[str]]:
+    """
+    Split `site_url` into the base URL of requests and the path of the socket to send them to.
+
+    A `unix:///path/to/site.sock` address is requested as `http://localhost` over the socket
+    at `/path/to/site.sock`. Any other address is requested as is, without a socket path.
+    """
+    if site_url.startswith(UNIX_SCHEME):
+        return 'http://localhost', site_url[len(UNIX_SCHEME):]
+
+    return site_url, None
+
+
+class PoolMonitor:
+    """Track connection pool usage of a session through aiohttp's tracing hooks."""
+
+    def __init__(self) -> None:
+        self.created = 0
+        self.reused = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_connection_queued_start.append(self._on_queued_start)
+        self.trace_config.on_connection_queued_end.append(self._on_queued_end)
+        self.trace_config.on_connection_create_end.append(self._on_create_end)
+        self.trace_config.on_connection_reuseconn.append(self._on_reuseconn)
+
+    async def _on_queued_start(self, session: aiohttp.ClientSession, ctx: t.Any, params: t.Any) -> None:
+        ctx.queued_at = time.perf_counter()
+
+    async def _on_queued_end(self, session: aiohttp.ClientSession, ctx: t.Any, params: t.Any) -> None:
+        self.waits += 1
+        self.wait_time += time.perf_counter() - ctx.queued_at
+
+    async def _on_create_end(self, session: aiohttp.ClientSession, ctx: t.Any, params: t.Any) -> None:
+        self.created += 1
+
+    async def _on_reuseconn(self, session: aiohttp.ClientSession, ctx: t.Any, params: t.Any) -> None:
+        self.reused += 1
+
+    def stats(self, connector: t.Optional[aiohttp.BaseConnector]) -> PoolStats:
+        """Return a snapshot of the pool usage of `connector`."""
+        # aiohttp does not expose these publicly, so be defensive about their presence
+        acquired = getattr(connector, '_acquired', ())
+        idle = getattr(connector, '_conns', dict())
+        waiters = getattr(connector, '_waiters', dict())
+
+        return PoolStats(
+            in_use=len(acquired),
+            idle=sum(len(conns) for conns in idle.values()),
+            waiting=sum(len(queue) for queue in waiters.values()),
+            limit=getattr(connector, 'limit', 0),
+            limit_per_host=getattr(connector, 'limit_per_host', 0),
+            created=self.created,
+            reused=self.reused,
+            waits=self.waits,
+            wait_time=self.wait_time
+        )
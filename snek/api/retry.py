@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import typing as t
+
+from snek.api.config import from_env
+
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+def parse_retry_after(value: t.Optional[str]) -> t.Optional[float]:
+    """Parse a `Retry-After` header given either in seconds or as an HTTP date into seconds."""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy(t.NamedTuple):
+    """How failed Snek API requests are retried."""
+
+    retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> 'RetryPolicy':
+        """Create a policy from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+    def should_retry(self, method: str, attempt: int, status: t.Optional[int] = None) -> bool:
+        """
+        Return True if the `attempt`th attempt (counting from 0) of a request should be retried.
+
+        A `status` of None means the request failed without a response. Only idempotent
+        methods are retried, except on 429 because a rate limited request was never processed.
+        """
+        if attempt >= self.retries:
+            return False
+
+        if status is not None and status not in RETRY_STATUSES:
+            return False
+
+        return method in IDEMPOTENT_METHODS or status == 429
+
+    def delay(self, attempt: int, retry_after: t.Optional[str] = None) -> t.Optional[float]:
+        """
+        Return the seconds to wait before retrying after the `attempt`th attempt.
+
+        A `Retry-After` header takes precedence over the jittered exponential backoff.
+        None is returned if the server asks to wait longer than `backoff_max`.
+        """
+        if (seconds := parse_retry_after(retry_after)) is not None:
+            return seconds if seconds <= self.backoff_max else None
+
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
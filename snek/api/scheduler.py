@@ -0,0 +1,204 @@
+import asyncio
+from collections import deque, namedtuple
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+import time
+import typing as t
+
+from snek.api.config import from_env
+
+LaneStats = namedtuple(
+    'LaneStats',
+    ('in_flight', 'queued', 'max_queued', 'requests', 'queued_requests', 'wait_time', 'max_wait')
+)
+
+
+class Priority(IntEnum):
+    """Scheduling lanes of Snek API requests, from most to least urgent."""
+
+    INTERACTIVE = 0
+    LISTENER = 1
+    BULK = 2
+    BACKGROUND = 3
+
+
+current_priority = ContextVar('current_priority', default=Priority.LISTENER)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> t.Iterator[None]:
+    """Send the Snek API requests made within this context, including in tasks it creates, in `priority`'s lane."""
+    token = current_priority.set(priority)
+
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class SchedulerConfig(t.NamedTuple):
+    """
+    Concurrency limits and rate limits of the request lanes.
+
+    `max_concurrency` bounds requests in flight across all lanes, so lanes with a lower limit
+    leave room for the more urgent ones. A rate of 0 leaves a lane without rate limit. The
+    background lane is rate limited by default, as it's meant for work that can always wait.
+    """
+
+    max_concurrency: int = 24
+    interactive_limit: int = 24
+    listener_limit: int = 16
+    bulk_limit: int = 12
+    background_limit: int = 4
+    interactive_rate: float = 0.0
+    listener_rate: float = 0.0
+    bulk_rate: float = 0.0
+    background_rate: float = 5.0
+
+    @classmethod
+    def from_env(cls) -> 'SchedulerConfig':
+        """Create a config from `SNEK_API_*` environment variables, falling back to the defaults."""
+        return from_env(cls)
+
+    def limit(self, priority: Priority) -> int:
+        return getattr(self, f'{priority.name.lower()}_limit')
+
+    def rate(self, priority: Priority) -> float:
+        return getattr(self, f'{priority.name.lower()}_rate')
+
+
+class TokenBucket:
+    """Limit an average rate of `rate` acquisitions per second, allowing bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Lane:
+    """The waiting requests and statistics of a priority lane."""
+
+    def __init__(self) -> None:
+        self.waiters: t.Deque[asyncio.Future] = deque()
+        self.in_flight = 0
+
+        self.max_queued = 0
+        self.requests = 0
+        self.queued_requests = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def stats(self) -> LaneStats:
+        return LaneStats(
+            in_flight=self.in_flight,
+            queued=len(self.waiters),
+            max_queued=self.max_queued,
+            requests=self.requests,
+            queued_requests=self.queued_requests,
+            wait_time=self.wait_time,
+            max_wait=self.max_wait
+        )
+
+
+class RequestScheduler:
+    """
+    Hand out request slots by priority.
+
+    A free slot always goes to the most urgent lane with waiting requests that is below
+    its own limit, and requests within a lane are served in order.
+    """
+
+    def __init__(self, config: SchedulerConfig) -> None:
+        self.config = config
+        self.in_flight = 0
+
+        self.lanes = {priority: Lane() for priority in Priority}
+        self.buckets = {
+            priority: TokenBucket(rate, max(1.0, rate))
+            for priority in Priority
+            if (rate := config.rate(priority)) > 0
+        }
+
+    @property
+    def stats(self) -> t.Dict[Priority, LaneStats]:
+        return {priority: lane.stats for priority, lane in self.lanes.items()}
+
+    def _can_start(self, priority: Priority) -> bool:
+        return (
+            self.in_flight < self.config.max_concurrency
+            and self.lanes[priority].in_flight < self.config.limit(priority)
+        )
+
+    def _start(self, priority: Priority) -> None:
+        self.in_flight += 1
+        self.lanes[priority].in_flight += 1
+
+    def _finish(self, priority: Priority) -> None:
+        self.in_flight -= 1
+        self.lanes[priority].in_flight -= 1
+
+        for waiting_priority, lane in self.lanes.items():
+            while lane.waiters and self._can_start(waiting_priority):
+                if not (waiter := lane.waiters.popleft()).done():
+                    self._start(waiting_priority)
+                    waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: t.Optional[Priority] = None) -> t.AsyncIterator[None]:
+        """Hold a request slot in the lane of `priority`, or of the current priority if not given."""
+        if priority is None:
+            priority = current_priority.get()
+
+        lane = self.lanes[priority]
+
+        if (bucket := self.buckets.get(priority)) is not None:
+            await bucket.acquire()
+
+        queued_at = time.monotonic()
+
+        if lane.waiters or not self._can_start(priority):
+            waiter = asyncio.get_event_loop().create_future()
+            lane.waiters.append(waiter)
+            lane.queued_requests += 1
+            lane.max_queued = max(lane.max_queued, len(lane.waiters))
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # The slot may have been handed over right before the cancellation
+                if waiter.done() and not waiter.cancelled():
+                    self._finish(priority)
+                elif waiter in lane.waiters:
+                    lane.waiters.remove(waiter)
+                raise
+
+        else:
+            self._start(priority)
+
+        waited = time.monotonic() - queued_at
+        lane.requests += 1
+        lane.wait_time += waited
+        lane.max_wait = max(lane.max_wait, waited)
+
+        try:
+            yield
+        finally:
+            self._finish(priority)
@@ -0,0 +1,37 @@
+import asyncio
+import typing as t
+
+T = t.TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Share one in-flight call, and its result, between concurrent callers using the same key.
+
+    The call runs in its own task, so a cancelled caller doesn't cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        self.calls: t.Dict[t.Hashable, asyncio.Future] = dict()
+
+        self.hits = 0
+        self.misses = 0
+
+    async def do(self, key: t.Hashable, func: t.Callable[[], t.Awaitable[T]]) -> T:
+        """Await the call in flight for `key`, or start one with `func` if there is none."""
+        if (task := self.calls.get(key)) is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = self.calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._forget(key, task))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: t.Hashable, task: asyncio.Future) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -2,9 +2,10 @@ import logging
 import typing as t
 
 import discord
-from discord.ext.commands import Bot, Cog, when_mentioned_or
+from discord.ext.commands import Bot, Cog, Context, when_mentioned_or
 
-from snek.api import APIClient
+from snek.api import APIClient, Priority, request_priority
+from snek.chunking import ChunkingConfig, GuildChunker
 
 log = logging.getLogger('Snek')
 
@@ -13,11 +14,17 @@ class Snek(Bot):
     """The ultimate multi-purpose Discord bot."""
 
     def __init__(self, *args, **kwargs):
+        chunking = ChunkingConfig.from_env()
+        kwargs.setdefault('chunk_guilds_at_startup', not chunking.lazy_chunking)
+
         super().__init__(*args, **kwargs)
         log.info('Snek initializing..')
 
         self.api_client = APIClient(loop=self.loop)
 
+        # Chunks the guilds after startup, if they aren't chunked before the bot is ready
+        self.chunker = GuildChunker(self, chunking)
+
         # Syncer takes care of this
         self.configs: t.Optional[t.Dict[int, str]] = None
 
@@ -26,8 +33,40 @@ class Snek(Bot):
         super().add_cog(cog)
         log.info(f"Cog loaded: {cog.qualified_name}")
 
+    async def login(self, *args, **kwargs) -> None:
+        """Log in to Discord and warm up the Snek API connections before the gateway connects."""
+        await super().login(*args, **kwargs)
+        await self.api_client.warm_up()
+
+    async def on_ready(self) -> None:
+        """Chunk the guilds which weren't chunked before the bot was ready in the background."""
+        self.chunker.start()
+
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        """Chunk the joined guild in the background, as it isn't chunked when joined if chunking is lazy."""
+        self.chunker.start((guild,))
+
+    async def on_message(self, message: discord.Message) -> None:
+        """Count the message towards the activity of its guild for lazy chunking, and process commands."""
+        self.chunker.touch(message.guild)
+        await super().on_message(message)
+
+    async def invoke(self, ctx: Context) -> None:
+        """
+        Invoke the command with its Snek API requests scheduled ahead of listener and bulk traffic.
+
+        The guild is chunked first if it isn't yet, so the command sees all of its members. Messages
+        which aren't commands are left to the background chunking.
+        """
+        with request_priority(Priority.INTERACTIVE):
+            if ctx.valid:
+                await self.chunker.ensure(ctx.guild)
+
+            await super().invoke(ctx)
+
     async def close(self) -> None:
         """Close the Discord and API Client connection."""
+        self.chunker.stop()
         await super().close()
         await self.api_client.close()
 
@@ -0,0 +1,154 @@
+import asyncio
+from collections import Counter
+import heapq
+import logging
+import time
+import typing as t
+
+import discord
+from discord.ext.commands import Bot
+
+from snek.api.config import from_env
+
+log = logging.getLogger(__name__)
+
+
+class ChunkingConfig(t.NamedTuple):
+    """
+    How the members of the guilds are fetched once connected to Discord.
+
+    By default, every guild is chunked before the bot is ready. With `lazy_chunking`, the bot is
+    ready as soon as the guilds are received, and the guilds which aren't chunked yet are chunked
+    in the background, `chunking_concurrency` at a time. Guilds in which commands are invoked are
+    chunked right away, and the others by how many messages were seen in them since.
+    """
+
+    lazy_chunking: bool = False
+    chunking_concurrency: int = 2
+
+    @classmethod
+    def from_env(cls) -> 'ChunkingConfig':
+        """Create a config from `SNEK_*` environment variables, falling back to the defaults."""
+        return from_env(cls, prefix='SNEK_')
+
+
+class GuildChunker:
+    """
+    Chunk the guilds which weren't chunked at startup, the most active ones first.
+
+    Guilds joined later are queued as well. Each guild is chunked once, whether in the background
+    or on demand, and a `guild_chunked` event is dispatched with it once its members are all in
+    the cache.
+    """
+
+    def __init__(self, bot: Bot, config: ChunkingConfig) -> None:
+        self.bot = bot
+        self.config = config
+
+        # IDs of the guilds left to chunk in the background, and their queue by priority
+        self.pending: t.Set[int] = set()
+        self.queue: t.List[t.Tuple[int, int, int]] = []
+
+        # Messages seen in the pending guilds
+        self.activity: t.Counter[int] = Counter()
+
+        # The chunk requests in flight, by guild ID
+        self.chunking: t.Dict[int, asyncio.Task] = dict()
+
+        self.task: t.Optional[asyncio.Task] = None
+        self.chunked = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.lazy_chunking
+
+    def _push(self, guild: discord.Guild) -> None:
+        # Smaller guilds first among those as active, so most guilds are complete as soon as possible
+        heapq.heappush(self.queue, (-self.activity[guild.id], guild.member_count or 0, guild.id))
+
+    def touch(self, guild: t.Optional[discord.Guild]) -> None:
+        """Count a message seen in `guild`, moving it forward in the queue if it's still pending."""
+        if guild is not None and guild.id in self.pending:
+            self.activity[guild.id] += 1
+            self._push(guild)
+
+    def start(self, guilds: t.Optional[t.Iterable[discord.Guild]] = None) -> None:
+        """
+        Queue the `guilds` which aren't chunked, all of those of the bot by default.
+
+        They're chunked in the background, which is started unless it's running already.
+        """
+        if not self.enabled:
+            return
+
+        for guild in self.bot.guilds if guilds is None else guilds:
+            if not guild.chunked and guild.id not in self.pending and guild.id not in self.chunking:
+                self.pending.add(guild.id)
+                self._push(guild)
+
+        if self.pending and (self.task is None or self.task.done()):
+            log.info(f'Chunking {len(self.pending)} guilds in the background.')
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+    async def ensure(self, guild: t.Optional[discord.Guild]) -> None:
+        """Chunk `guild` now if it isn't chunked, e.g. before a command is invoked in it."""
+        if not self.enabled or guild is None or guild.chunked:
+            return
+
+        try:
+            await self._chunk(guild)
+        except Exception:
+            log.exception(f'Chunking guild {guild.name} ({guild.id}) on demand failed!')
+
+    def _next(self) -> t.Optional[discord.Guild]:
+        """Pop the most active pending guild which is still in the cache and not chunked."""
+        while self.queue:
+            activity, _, guild_id = heapq.heappop(self.queue)
+
+            # Guilds are pushed again as they become more active, which leaves stale entries behind
+            if guild_id not in self.pending or -activity != self.activity[guild_id]:
+                continue
+
+            self.pending.discard(guild_id)
+            if (guild := self.bot.get_guild(guild_id)) is not None and not guild.chunked:
+                return guild
+
+        return None
+
+    async def _chunk(self, guild: discord.Guild) -> None:
+        """Chunk `guild`, sharing the request with any other caller chunking it at the same time."""
+        if (task := self.chunking.get(guild.id)) is None:
+            self.pending.discard(guild.id)
+            task = self.chunking[guild.id] = asyncio.create_task(self._request(guild))
+
+        await asyncio.shield(task)
+
+    async def _request(self, guild: discord.Guild) -> None:
+        try:
+            started = time.monotonic()
+            await guild.chunk()
+
+            log.debug(f'Chunked guild {guild.name} ({guild.id}) in {time.monotonic() - started:.1f}s.')
+            self.chunked += 1
+            self.bot.dispatch('guild_chunked', guild)
+        finally:
+            del self.chunking[guild.id]
+            self.activity.pop(guild.id, None)
+
+    async def _work(self) -> None:
+        while (guild := self._next()) is not None:
+            try:
+                await self._chunk(guild)
+            except Exception:
+                log.exception(f'Chunking guild {guild.name} ({guild.id}) failed, leaving it to be chunked on demand!')
+
+    async def _run(self) -> None:
+        started = time.monotonic()
+        await asyncio.gather(*(self._work() for _ in range(max(1, self.config.chunking_concurrency))))
+
+        elapsed = time.monotonic() - started
+        log.info(f'Background chunking finished in {elapsed:.0f}s, {self.chunked} guilds chunked so far.')
@@ -3,7 +3,7 @@ import typing as t
 
 from discord.ext.commands import Cog, Context, errors
 
-from snek.api import ResponseCodeError
+from snek.api import CircuitOpenError, ResponseCodeError
 from snek.bot import Snek
 
 log = logging.getLogger(__name__)
@@ -40,7 +40,7 @@ class ErrorHandler(Cog):
             await ctx.send(error)
 
         elif isinstance(error, errors.CommandInvokeError):
-            if isinstance(error.original, ResponseCodeError):
+            if isinstance(error.original, (ResponseCodeError, CircuitOpenError)):
                 await self.handle_snek_api_error(ctx, error.original)
             else:
                 await self.handle_unexpected_error(ctx, error.original)
@@ -119,9 +119,24 @@ class ErrorHandler(Cog):
                 "Sorry, it looks like I don't have the permissions or roles I need to do that."
             )
 
-    async def handle_snek_api_error(self, ctx: Context, error: ResponseCodeError) -> None:
-        """Send an error message in `ctx.channel` for ResponseCodeError and log it."""
-        if error.status == 404:
+    async def handle_snek_api_error(
+        self,
+        ctx: Context,
+        error: t.Union[ResponseCodeError, CircuitOpenError]
+    ) -> None:
+        """
+        Send an error message in `ctx.channel` for ResponseCodeError and CircuitOpenError and log it.
+
+        Server errors use the state of the API client's circuit breakers to tell the user
+        whether the Snek API is degraded, without making another request.
+        """
+        if isinstance(error, CircuitOpenError):
+            log.debug(f"Snek API circuit breaker for {error.family} is open for command {ctx.command}")
+            await ctx.send(
+                f"Sorry, the Snek API is currently degraded. Please try again in {error.retry_after:.0f} seconds."
+            )
+
+        elif error.status == 404:
             log.debug(f"Snek API responded with 404 for command {ctx.command}")
             await ctx.send("There does not seem to be anything matching your query.")
 
@@ -131,7 +146,11 @@ class ErrorHandler(Cog):
 
         elif 500 <= error.status < 600:
             log.warning(f"Snek API responded with {error.status} for command {ctx.command}")
-            await ctx.send("Sorry, there seems to be an internal issue with the Snek API.")
+
+            if self.bot.api_client.breakers.is_degraded():
+                await ctx.send("Sorry, the Snek API is currently degraded. Please try again later.")
+            else:
+                await ctx.send("Sorry, there seems to be an internal issue with the Snek API.")
 
         else:
             log.warning(f"Unexpected response from Snek API for command {ctx.command}: {error.status}")
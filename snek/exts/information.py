@@ -206,24 +206,30 @@ class Information(Cog):
         return embed
 
     async def create_user_embed(self, ctx: Context, user: t.Union[discord.User, int, str]) -> discord.Embed:
-        """Creates an embed containing information saved in the database about a user."""
+        """
+        Creates an embed containing information saved in the database about a user.
+
+        The user lookups are hedged, since the command waits on them.
+        """
         if isinstance(user, (int, str)):
 
             if isinstance(user, int):
-                user = await self.bot.api_client.get(f'users/{user}')
+                user = await self.bot.api_client.get(f'users/{user}', hedge=True)
 
             else:
                 if '#' in user:
                     name, discrim = user.rsplit('#', maxsplit=1)
                     users = await self.bot.api_client.get(
                         'users',
-                        params={'name': name, 'discriminator': discrim}
+                        params={'name': name, 'discriminator': discrim},
+                        hedge=True
                     )
 
                 else:
                     users = await self.bot.api_client.get(
                         'users',
-                        params={'name': user}
+                        params={'name': user},
+                        hedge=True
                     )
 
                 if not users:
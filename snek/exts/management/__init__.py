@@ -1,7 +1,9 @@
 from snek.bot import Snek
+from snek.exts.management.api_stats import APIStats
 from snek.exts.management.extension_manager import ExtensionManager
 
 
 def setup(bot: Snek) -> None:
     """Load the management cogs."""
+    bot.add_cog(APIStats(bot))
     bot.add_cog(ExtensionManager(bot))
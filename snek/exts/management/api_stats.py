@@ -0,0 +1,57 @@
+import logging
+
+import discord
+from discord.ext.commands import Cog, Context, group
+
+from snek.bot import Snek
+from snek.utils import PaginatedEmbed
+
+log = logging.getLogger(__name__)
+
+
+class APIStats(Cog):
+    """Commands to inspect how the bot uses the Snek API."""
+
+    def __init__(self, bot: Snek) -> None:
+        self.bot = bot
+
+    @group(name='api', invoke_without_command=True)
+    async def api_group(self, ctx: Context) -> None:
+        """Inspect and reset the Snek API client's metrics."""
+        await ctx.send_help(ctx.command)
+
+    @api_group.command(name='metrics', aliases=('m',))
+    async def metrics_command(self, ctx: Context) -> None:
+        """Show latency percentiles, status codes and payload sizes for each Snek API endpoint."""
+        lines = self.bot.api_client.metrics.summary()
+
+        if lines:
+            lines.append(self.bot.api_client.compressor.summary())
+            lines.append(self.bot.api_client.hedging.summary())
+        else:
+            await ctx.send('No Snek API requests have been recorded yet.')
+            return
+
+        embed = PaginatedEmbed.from_lines(
+            lines,
+            max_lines=5,
+            page_prefix='```',
+            page_suffix='```',
+            title='Snek API Metrics',
+            color=discord.Color.blurple()
+        )
+
+        await embed.paginate(ctx)
+
+    @api_group.command(name='reset')
+    async def reset_command(self, ctx: Context) -> None:
+        """Reset the Snek API metrics."""
+        self.bot.api_client.metrics.reset()
+        self.bot.api_client.compressor.reset()
+
+        log.info(f'{ctx.author} reset the Snek API metrics.')
+        await ctx.send('✅ The Snek API metrics have been reset.')
+
+    async def cog_check(self, ctx: Context) -> bool:
+        """Only allow the owner of the bot to invoke the commands in this cog."""
+        return await self.bot.is_owner(ctx.author)
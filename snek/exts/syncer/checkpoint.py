@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import time
+import typing as t
+
+from snek.api.config import from_env
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+
+def record_hash(record: tuple) -> str:
+    """Return a short hash of the content of the namedtuple `record`."""
+    return hashlib.blake2b(repr(tuple(record)).encode(), digest_size=8).hexdigest()
+
+
+def write_json(path: pathlib.Path, data: t.Any) -> None:
+    """Replace the file at `path` with `data` as JSON through a temporary file, so it's never half written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'.{path.name}.tmp')
+
+    with temporary.open('w', encoding='utf-8') as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temporary, path)
+
+
+class CheckpointConfig(t.NamedTuple):
+    """
+    Where the sync checkpoint is kept and for how long it's trusted.
+
+    An empty `checkpoint_path` disables the checkpoint. Sections older than
+    `checkpoint_max_age` seconds are ignored, so the database is fully diffed again.
+    """
+
+    checkpoint_path: str = 'data/sync_checkpoint.json'
+    checkpoint_max_age: float = 24 * 60 * 60.0
+
+    @classmethod
+    def from_env(cls) -> 'CheckpointConfig':
+        """Create a config from `SNEK_SYNC_*` environment variables, falling back to the defaults."""
+        return from_env(cls, prefix='SNEK_SYNC_')
+
+
+class SyncCheckpoint:
+    """
+    Content hashes of the records pushed by the last successful synchronisation of each syncer.
+
+    The checkpoint is a JSON file with a section per syncer, guarded by a checksum and bound
+    to the Snek site it was taken against. It's replaced atomically, so a crash mid-write leaves
+    the previous checkpoint in place. Anything unexpected in it makes it invalid as a whole.
+    """
+
+    def __init__(self, config: CheckpointConfig, site: str) -> None:
+        self.config = config
+        self.site = site
+
+        self.path = pathlib.Path(config.checkpoint_path) if config.checkpoint_path else None
+        self.sections: t.Optional[t.Dict[str, t.Dict]] = None
+
+        # Serialises reads and writes of the file, created on first use so it's bound to the running loop
+        self.lock: t.Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_env(cls, site: str) -> 'SyncCheckpoint':
+        return cls(CheckpointConfig.from_env(), site)
+
+    @staticmethod
+    def checksum(sections: t.Dict[str, t.Dict]) -> str:
+        return hashlib.sha256(json.dumps(sections, sort_keys=True).encode()).hexdigest()
+
+    def _read(self) -> t.Dict[str, t.Dict]:
+        """Return the valid sections of the checkpoint file, or none if it's missing, outdated or corrupt."""
+        try:
+            with self.path.open(encoding='utf-8') as file:
+                checkpoint = json.load(file)
+
+            if checkpoint['version'] != CHECKPOINT_VERSION or checkpoint['site'] != self.site:
+                log.info('Ignoring the sync checkpoint, as it was taken with another version or site.')
+                return dict()
+
+            if checkpoint['checksum'] != self.checksum(checkpoint['sections']):
+                log.warning('Ignoring the sync checkpoint, as its checksum does not match.')
+                return dict()
+
+            return checkpoint['sections']
+
+        except FileNotFoundError:
+            return dict()
+
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            log.warning(f'Ignoring the sync checkpoint, as it could not be read: {err!r}')
+            return dict()
+
+    def _write(self, sections: t.Dict[str, t.Dict]) -> None:
+        """Replace the checkpoint file with `sections` through a temporary file."""
+        checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'site': self.site,
+            'sections': sections,
+            'checksum': self.checksum(sections)
+        }
+
+        write_json(self.path, checkpoint)
+
+    def _lock(self) -> asyncio.Lock:
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        return self.lock
+
+    async def _sections(self) -> t.Dict[str, t.Dict]:
+        if self.sections is None:
+            self.sections = await asyncio.get_event_loop().run_in_executor(None, self._read)
+
+        return self.sections
+
+    async def load(self, name: str) -> t.Optional[t.Dict[int, str]]:
+        """Return the record hashes of the syncer `name` by ID, or None if there is no valid section for it."""
+        if self.path is None:
+            return None
+
+        async with self._lock():
+            section = (await self._sections()).get(name)
+
+        if section is None:
+            return None
+
+        try:
+            age = time.time() - section['saved_at']
+            hashes = {int(record_id): record_hash for record_id, record_hash in section['hashes'].items()}
+        except (AttributeError, KeyError, TypeError, ValueError):
+            log.warning(f'Ignoring the {name} sync checkpoint, as it is malformed.')
+            return None
+
+        if age > self.config.checkpoint_max_age:
+            log.info(f'Ignoring the {name} sync checkpoint, as it is {age / 3600:.1f} hours old.')
+            return None
+
+        return hashes
+
+    async def save(self, name: str, hashes: t.Dict[int, str]) -> None:
+        """Store `hashes` as the section of the syncer `name`. Failing to write the file is only logged."""
+        if self.path is None:
+            return
+
+        async with self._lock():
+            sections = dict(await self._sections())
+            sections[name] = {'saved_at': time.time(), 'hashes': {str(k): v for k, v in hashes.items()}}
+
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self._write, sections)
+            except OSError as err:
+                log.warning(f'Could not write the sync checkpoint: {err!r}')
+                return
+
+            self.sections = sections
+
+    async def update(self, name: str, hashes: t.Dict[int, str], removed: t.Iterable[int] = ()) -> None:
+        """
+        Merge `hashes` into the section of the syncer `name` and drop the `removed` IDs from it.
+
+        This is for synchronisations of part of the records, so the section keeps its age and is
+        left alone if there is none, since the records outside of the part weren't checked.
+        """
+        if self.path is None:
+            return
+
+        async with self._lock():
+            sections = dict(await self._sections())
+            if not isinstance(section := sections.get(name), dict) or not isinstance(section.get('hashes'), dict):
+                return
+
+            section_hashes = {**section['hashes'], **{str(k): v for k, v in hashes.items()}}
+            for record_id in removed:
+                section_hashes.pop(str(record_id), None)
+
+            sections[name] = {**section, 'hashes': section_hashes}
+
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self._write, sections)
+            except OSError as err:
+                log.warning(f'Could not write the sync checkpoint: {err!r}')
+                return
+
+            self.sections = sections
+
+    async def discard(self, name: str) -> None:
+        """Forget the section of the syncer `name`, so its next synchronisation diffs the whole database."""
+        if self.path is None or self.sections is None or name not in self.sections:
+            return
+
+        async with self._lock():
+            sections = {key: section for key, section in self.sections.items() if key != name}
+
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self._write, sections)
+            except OSError as err:
+                log.warning(f'Could not write the sync checkpoint: {err!r}')
+
+            self.sections = sections
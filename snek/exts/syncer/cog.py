@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import typing as t
 
@@ -5,9 +6,14 @@ import discord
 from discord.ext import commands
 from discord.ext.commands import Cog, Context
 
-from snek.api import ResponseCodeError
+from snek.api import Priority, request_priority, ResponseCodeError
 from snek.bot import Snek
+from snek.exts.syncer.checkpoint import SyncCheckpoint
+from snek.exts.syncer.mirror import UserState
+from snek.exts.syncer.reconciler import ReconcileConfig, Reconciler
+from snek.exts.syncer.resume import ResumeConfig, ResumeTracker, SyncMode
 from snek.exts.syncer.syncers import GuildSyncer, RoleSyncer, UserSyncer
+from snek.exts.syncer.syncers.user import User
 
 log = logging.getLogger(__name__)
 
@@ -17,44 +23,145 @@ class Syncer(Cog):
     def __init__(self, bot: Snek) -> None:
         self.bot = bot
 
-        self.guild_syncer = GuildSyncer(bot)
-        self.role_syncer = RoleSyncer(bot)
-        self.user_syncer = UserSyncer(bot)
+        self.checkpoint = SyncCheckpoint.from_env(bot.api_client.site_url())
 
-    async def sync(self, ctx: t.Optional[Context] = None) -> None:
-        """Synchronise the guilds/roles/users with the database."""
-        await self.guild_syncer.sync(ctx)
-        await self.role_syncer.sync(ctx)
-        await self.user_syncer.sync(ctx)
+        self.guild_syncer = GuildSyncer(bot, self.checkpoint)
+        self.role_syncer = RoleSyncer(bot, self.checkpoint)
+        self.user_syncer = UserSyncer(bot, self.checkpoint)
+
+        # Started once the bot is ready
+        self.reconciler = Reconciler(ReconcileConfig.from_env(), lambda: self.bot.guilds, self.reconcile)
+        self.reconcile_task: t.Optional[asyncio.Task] = None
+
+        # Picks how much to synchronise when the bot is ready again after a disconnection
+        self.resume = ResumeTracker(ResumeConfig.from_env())
+
+        # Set once the synchronisation on ready is done, which guilds chunked in the meantime wait for
+        self.ready_synced = asyncio.Event()
+
+        # Held by the synchronisation on ready and by each reconciled slice, so they don't run at once
+        self.ready_lock = asyncio.Lock()
+
+    async def sync(
+        self,
+        ctx: t.Optional[Context] = None,
+        use_checkpoint: bool = False,
+        scope: t.Optional[t.AbstractSet[int]] = None,
+        priority: Priority = Priority.BULK
+    ) -> bool:
+        """
+        Synchronise the guilds/roles/users with the database, returning whether every syncer succeeded.
+
+        Roles reference guilds and users reference both, so each syncer writes after the previous
+        one is done. The diffs don't depend on those writes though, so they are all computed
+        while the guilds are synchronised. With `use_checkpoint`, only the records which changed
+        since the last synchronisation are diffed, where the checkpoint allows it. With a `scope`
+        of guild IDs, only those guilds, their roles and their members are synchronised. Requests
+        are sent in the lane of `priority`.
+        """
+        with request_priority(priority):
+            guild_diff = asyncio.create_task(self.guild_syncer.get_diff(use_checkpoint, scope))
+            role_diff = asyncio.create_task(self.role_syncer.get_diff(use_checkpoint, scope))
+            user_diff = asyncio.create_task(self.user_syncer.get_diff(use_checkpoint, scope))
+
+        try:
+            succeeded = all([
+                await self.guild_syncer.sync(ctx, guild_diff, priority),
+                await self.role_syncer.sync(ctx, role_diff, priority),
+                await self.user_syncer.sync(ctx, user_diff, priority)
+            ])
+        finally:
+            # Don't leave the diffs running if the synchronisation was cancelled, e.g. on unload
+            for diff in (guild_diff, role_diff, user_diff):
+                diff.cancel()
+
+        if succeeded and scope is None:
+            self.resume.synced()
+
+        return succeeded
+
+    async def reconcile(self, scope: t.Set[int]) -> None:
+        """Synchronise the guilds in `scope` in the background lane, for the reconciler."""
+        async with self.ready_lock:
+            await self.sync(scope=scope, priority=Priority.BACKGROUND)
+
+    def start_reconciler(self) -> None:
+        """Start the background reconciliation, unless it's disabled or running already."""
+        if self.reconciler.config.reconcile_interval <= 0:
+            return
+
+        if self.reconcile_task is None or self.reconcile_task.done():
+            self.reconcile_task = asyncio.create_task(self.reconciler.run())
 
     @Cog.listener()
     async def on_ready(self) -> None:
-        """Synchronise on ready."""
-        await self.sync()
+        """
+        Synchronise on ready, as much as the events possibly missed since the last synchronisation call for.
+
+        After a short disconnection with few missed events, the synchronisation is skipped and left to the
+        background reconciliation. Otherwise only what changed since the last synchronisation is pushed,
+        unless so much may have been missed that the whole database is diffed. Slices of the background
+        reconciliation wait for this synchronisation, which starts the reconciliation once it's over,
+        whether it succeeded or not.
+        """
+        mode, reason = self.resume.mode()
+        log.info(f'Bot ready, synchronisation mode {mode.name}: {reason}.')
+        self.ready_synced.clear()
+
+        try:
+            async with self.ready_lock:
+                if mode is SyncMode.SKIP:
+                    self.resume.resumed()
+                else:
+                    await self.sync(use_checkpoint=mode is SyncMode.PARTIAL)
+        finally:
+            self.ready_synced.set()
+            self.start_reconciler()
 
     @Cog.listener()
-    async def on_guild_join(self, guild: discord.Guild) -> None:
-        """Adds the joined guild into the database through the Snek API."""
-        payload = {
-            'id': guild.id,
-            'name': guild.name,
-            'created_at': str(guild.created_at),
-            'icon_url': str(guild.icon_url)
-        }
+    async def on_guild_chunked(self, guild: discord.Guild) -> None:
+        """
+        Synchronise the members of a guild once it's chunked, if it wasn't chunked before the bot was ready.
 
-        log.info(f'Joined guild {guild.name} ({guild.id})')
+        Until then, the synchronisations keep the memberships of its users from the database. This
+        waits for the synchronisation on ready, so the two don't write the same users at once.
+        """
+        await self.ready_synced.wait()
 
-        try:
-            await self.bot.api_client.put(f'guilds/{guild.id}', json=payload)
+        log.debug(f'Synchronising the members of guild {guild.name} ({guild.id}), which is chunked now.')
+        await self.user_syncer.sync(diff=self.user_syncer.get_diff(scope={guild.id}))
 
-        except ResponseCodeError as err:
-            if err.response.status != 404:
-                raise
+    @Cog.listener()
+    async def on_disconnect(self) -> None:
+        """Note when the connection to Discord was lost, to tell how many events were missed once ready again."""
+        self.resume.disconnected()
+
+    @Cog.listener()
+    async def on_resumed(self) -> None:
+        """Forget the disconnection, as resuming the session replays the events missed in the meantime."""
+        self.resume.resumed()
+
+    def cog_unload(self) -> None:
+        """Stop the background reconciliation."""
+        if self.reconcile_task is not None:
+            self.reconcile_task.cancel()
 
-            # If we got a 404, that means the guild is new.
-            await self.bot.api_client.post('guilds', json=payload)
+    @Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        """Adds the joined guild, its roles and its members into the database through the Snek API."""
+        log.info(f'Joined guild {guild.name} ({guild.id})')
+        self.resume.event()
+
+        await self.sync(scope={guild.id})
 
-        await self.sync()
+    @Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        """Forget the memberships in the left guild, so its members aren't synchronised as in it anymore."""
+        log.info(f'Left guild {guild.name} ({guild.id})')
+        self.resume.event()
+
+        self.user_syncer.membership.remove_guild(guild.id)
+        self.user_syncer.unchunked_guilds.discard(guild.id)
 
     @Cog.listener()
     async def on_guild_update(self, before: discord.Guild, after: discord.Guild) -> None:
@@ -68,12 +175,14 @@ class Syncer(Cog):
 
         if payload:
             log.trace(f'Updated guild {after.name} ({after.id})')
+            self.resume.event()
             await self.bot.api_client.patch(f'guilds/{after.id}', json=payload)
 
     @Cog.listener()
     async def on_guild_role_create(self, role: discord.Role) -> None:
         """Adds the newly created role to the database through the API."""
         log.trace(f'New role {role.name} ({role.id}) created in guild {role.guild.name} ({role.guild.id})')
+        self.resume.event()
         await self.bot.api_client.post(
             'roles',
             json={
@@ -86,6 +195,7 @@ class Syncer(Cog):
                 'guild': role.guild.id
             }
         )
+        self.role_syncer.known_ids.add(role.id)
 
     @Cog.listener()
     async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
@@ -102,13 +212,17 @@ class Syncer(Cog):
 
         if payload:
             log.trace(f'Updated role {after.name} ({after.id}) for guild {after.guild.name} ({after.guild.id})')
+            self.resume.event()
             await self.bot.api_client.patch(f'roles/{after.id}', json=payload)
 
     @Cog.listener()
     async def on_guild_role_delete(self, role: discord.Role) -> None:
         """Deletes the role from the database when deleted from a guild."""
         log.trace(f'Deleted role {role.name} ({role.id}) from guild {role.guild.name} ({role.guild.id})')
+        self.resume.event()
+        self.user_syncer.membership.remove_role(role)
         await self.bot.api_client.delete(f'roles/{role.id}')
+        self.role_syncer.known_ids.discard(role.id)
 
     @Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
@@ -117,70 +231,139 @@ class Syncer(Cog):
 
         If the joining member is a user that is already know to the database (e.g. a user who
         previously left), it will update the user's information. If the user is not yet known,
-        the user is added.
+        the user is added. Which one it is, is looked up in the user IDs known to the user syncer.
         """
+        membership = self.user_syncer.membership
+        membership.add(member)
+
         payload = {
             'id': member.id,
             'name': member.name,
             'discriminator': member.discriminator,
             'created_at': str(member.created_at),
             'avatar_url': str(member.avatar_url),
-            'roles': sorted(role.id for role in member.roles),
-            'guilds': [guild.id for guild in self.bot.guilds if guild.get_member(member.id) is not None]
+            'roles': list(membership.role_ids(member.id)),
+            'guilds': list(membership.guild_ids(member.id))
         }
 
         log.trace(f'User {member.name} ({member.id}) joined guild {member.guild.name} ({member.guild.id})')
+        self.resume.event()
+
+        known_ids = self.user_syncer.known_ids
+        mirror = self.user_syncer.mirror
+
+        async with mirror.lock(member.id):
+            # Keep the memberships of the user in guilds which aren't chunked yet, as they're missing from the index
+            if known_ids.exists(member.id) is not False and (adjust := self.user_syncer.record_adjuster()):
+                if (state := await self._find_user_state(member.id)) is not None:
+                    user = adjust(User(**payload), User(**{**payload, 'roles': state.roles, 'guilds': state.guilds}))
+                    payload['roles'], payload['guilds'] = list(user.roles), list(user.guilds)
+
+            try:
+                await self.bot.api_client.upsert('users', member.id, payload, exists=known_ids.exists(member.id))
+            except Exception:
+                mirror.discard(member.id)
+                raise
 
-        try:
-            await self.bot.api_client.put(f'users/{member.id}', json=payload)
+            known_ids.add(member.id)
+            mirror.set(member.id, payload['roles'], payload['guilds'])
+
+    async def _user_state(self, user_id: int) -> UserState:
+        """Return the roles and guilds of the user in the database, fetching them if they aren't mirrored."""
+        if (state := self.user_syncer.mirror.get(user_id)) is None:
+            user = await self.bot.api_client.load('users', user_id)
+            state = UserState(tuple(user['roles']), tuple(user['guilds']))
 
+        return state
+
+    async def _find_user_state(self, user_id: int) -> t.Optional[UserState]:
+        """Return the roles and guilds of the user in the database like `_user_state`, or None if it isn't there."""
+        try:
+            return await self._user_state(user_id)
         except ResponseCodeError as err:
-            if err.response.status != 404:
+            if err.status != 404:
                 raise
+            return None
+
+    async def _patch_user_state(
+        self,
+        user_id: int,
+        state: UserState,
+        roles: t.Iterable[int],
+        guilds: t.Iterable[int]
+    ) -> None:
+        """
+        PATCH the roles and guilds of the user which changed from `state`, keeping the mirror up to date.
+
+        The IDs are sorted like in the records of the user syncer, so its next diff doesn't see them as changed.
+        """
+        mirror = self.user_syncer.mirror
+        roles, guilds = sorted(roles), sorted(guilds)
 
-            # If we got a 404, that means the user is new.
-            await self.bot.api_client.post('users', json=payload)
+        payload = dict()
+        if tuple(roles) != state.roles:
+            payload['roles'] = roles
+        if tuple(guilds) != state.guilds:
+            payload['guilds'] = guilds
+
+        if not payload:
+            mirror.set(user_id, roles, guilds)
+            return
+
+        try:
+            await self.bot.api_client.patch(f'users/{user_id}', json=payload)
+        except Exception:
+            mirror.discard(user_id)
+            raise
+
+        mirror.set(user_id, roles, guilds)
 
     @Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
-        """Update the roles of the member in the database if a change is detected."""
+        """
+        Update the roles of the member in the database if a change is detected.
+
+        The roles in the database are taken from the mirror of the user syncer, so only the PATCH is sent.
+        """
         if before.roles != after.roles:
+            self.user_syncer.membership.add(after)
+
             log.trace(
                 f'Updated roles for user {after.name} ({after.id}) in guild {after.guild.name} ({after.guild.id})'
             )
-
-            member_info = await self.bot.api_client.get(f'users/{after.id}')
+            self.resume.event()
 
             before_roles = set(role.id for role in before.roles)
             after_roles = set(role.id for role in after.roles)
-            roles = member_info['roles']
 
-            added = after_roles - before_roles
-            if added:
-                roles.extend(added)
+            async with self.user_syncer.mirror.lock(after.id):
+                state = await self._user_state(after.id)
+
+                added = after_roles - before_roles
+                deleted = before_roles - after_roles
 
-            deleted = before_roles - after_roles
-            if deleted:
-                for role in deleted:
-                    roles.remove(role)
+                roles = {role for role in state.roles if role not in deleted} | added
 
-            # There must either be a role added or removed, so both situations have been handled
-            await self.bot.api_client.patch(f'users/{after.id}', json={'roles': roles})
+                await self._patch_user_state(after.id, state, roles, list(state.guilds))
 
     @Cog.listener()
     async def on_member_remove(self, member: discord.Member) -> None:
         """Remove guild from the user's data in the database."""
         log.trace(f'User {member.name} ({member.id}) left guild {member.guild} ({member.guild.id})')
+        self.resume.event()
+        self.user_syncer.membership.remove(member)
 
-        member_info = await self.bot.api_client.get(f'users/{member.id}')
+        guild_roles = {role.id for role in member.guild.roles}
 
-        await self.bot.api_client.patch(
-            f'users/{member.id}',
-            json={
-                'guilds': list(set(member_info['guilds']) - {member.guild.id}),
-                'roles': list(set(member_info['roles']) - {role.id for role in member.guild.roles})
-            }
-        )
+        async with self.user_syncer.mirror.lock(member.id):
+            state = await self._user_state(member.id)
+
+            await self._patch_user_state(
+                member.id,
+                state,
+                roles=[role for role in state.roles if role not in guild_roles],
+                guilds=[guild for guild in state.guilds if guild != member.guild.id]
+            )
 
     @Cog.listener()
     async def on_user_update(self, before: discord.User, after: discord.User) -> None:
@@ -199,6 +382,7 @@ class Syncer(Cog):
             log.trace(
                 f'Updated user info for {after.name} ({after.id})'
             )
+            self.resume.event()
             await self.bot.api_client.patch(f'users/{after.id}', json=payload)
 
     @commands.group(name='sync', invoke_without_command=True)
@@ -0,0 +1,76 @@
+from collections import namedtuple
+import typing as t
+
+# `hashes` are the content hashes of the diffed records in the cache, to be checkpointed once the diff is synced.
+# `scope` holds the IDs of the guilds the diff is limited to, or is None if it covers every guild.
+Diff = namedtuple(
+    'Diff',
+    ('created', 'updated', 'deleted', 'hashes', 'from_checkpoint', 'scope'),
+    defaults=(None, False, None)
+)
+
+# A record which is only known by its ID, e.g. one to be deleted
+RecordID = namedtuple('RecordID', ('id',))
+
+
+class UnsortedRecordsError(ValueError):
+    """Raised when the records given to `merge_diff` aren't sorted by ID."""
+
+    def __init__(self, previous_id: int, record_id: int) -> None:
+        super().__init__(f'Record {record_id} came after record {previous_id}')
+        self.previous_id = previous_id
+        self.record_id = record_id
+
+
+async def merge_diff(
+    cache_records: t.Iterable[tuple],
+    db_records: t.AsyncIterable[tuple],
+    deletes: bool = False,
+    adjust: t.Optional[t.Callable[[tuple, tuple], tuple]] = None
+) -> Diff:
+    """
+    Return the difference between the cache and the database from their records sorted by ID.
+
+    Both streams are walked once side by side, like a merge join, so records are compared as they
+    arrive and only the records of the diff are kept. The database records are checked to be in
+    order, raising UnsortedRecordsError otherwise. Records of the database which aren't in the
+    cache are only returned as deleted if `deletes` is True. If given, `adjust` completes a record
+    of the cache from its record in the database before they're compared.
+    """
+    created, updated = set(), set()
+    deleted = set() if deletes else None
+
+    cache_iterator = iter(cache_records)
+    cache_record = next(cache_iterator, None)
+    previous_id = None
+
+    async for db_record in db_records:
+        if previous_id is not None and db_record.id <= previous_id:
+            raise UnsortedRecordsError(previous_id, db_record.id)
+        previous_id = db_record.id
+
+        while cache_record is not None and cache_record.id < db_record.id:
+            created.add(cache_record)
+            cache_record = next(cache_iterator, None)
+
+        if cache_record is not None and cache_record.id == db_record.id:
+            if adjust is not None:
+                cache_record = adjust(cache_record, db_record)
+            if cache_record != db_record:
+                updated.add(cache_record)
+            cache_record = next(cache_iterator, None)
+
+        elif deletes:
+            deleted.add(db_record)
+
+    while cache_record is not None:
+        created.add(cache_record)
+        cache_record = next(cache_iterator, None)
+
+    return Diff(created, updated, deleted)
+
+
+async def iter_records(records: t.Iterable[tuple]) -> t.AsyncIterator[tuple]:
+    """Yield `records` as an async stream, e.g. to diff records which are already in memory."""
+    for record in records:
+        yield record
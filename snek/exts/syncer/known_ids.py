@@ -0,0 +1,80 @@
+from array import array
+import bisect
+import itertools
+import typing as t
+
+
+class KnownIDs:
+    """
+    A compact set of the IDs of records known to exist in the database.
+
+    IDs are kept in a sorted array of 64-bit integers, which takes 8 bytes per ID instead of
+    the ~70 of a set of ints. IDs added or removed since are kept in small sets, which are
+    merged into the array once they grow past `merge_threshold`.
+    """
+
+    def __init__(self, merge_threshold: int = 1024) -> None:
+        self.merge_threshold = merge_threshold
+
+        self.ids = array('Q')
+        self.added: t.Set[int] = set()
+        self.removed: t.Set[int] = set()
+
+        self.loaded = False
+
+    def load(self, ids: t.Iterable[int]) -> None:
+        """Replace the known IDs with `ids`, e.g. those fetched from the database by a sync."""
+        self.ids = ids if isinstance(ids, array) and ids.typecode == 'Q' else array('Q', ids)
+
+        # IDs streamed from the database usually come in order already, which spares copying them
+        if any(previous > record_id for previous, record_id in zip(self.ids, itertools.islice(self.ids, 1, None))):
+            self.ids = array('Q', sorted(self.ids))
+        self.added.clear()
+        self.removed.clear()
+
+        self.loaded = True
+
+    def exists(self, record_id: int) -> t.Optional[bool]:
+        """Return whether the record is in the database, or None if the IDs haven't been loaded yet."""
+        return record_id in self if self.loaded else None
+
+    def _in_array(self, record_id: int) -> bool:
+        index = bisect.bisect_left(self.ids, record_id)
+        return index < len(self.ids) and self.ids[index] == record_id
+
+    def __contains__(self, record_id: int) -> bool:
+        if record_id in self.added:
+            return True
+
+        if record_id in self.removed:
+            return False
+
+        return self._in_array(record_id)
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.added) - len(self.removed)
+
+    def add(self, record_id: int) -> None:
+        self.removed.discard(record_id)
+
+        if not self._in_array(record_id):
+            self.added.add(record_id)
+            self._maybe_merge()
+
+    def discard(self, record_id: int) -> None:
+        self.added.discard(record_id)
+
+        if self._in_array(record_id):
+            self.removed.add(record_id)
+            self._maybe_merge()
+
+    def _maybe_merge(self) -> None:
+        """Merge the added and removed IDs into the array once there are enough of them."""
+        if len(self.added) + len(self.removed) < self.merge_threshold:
+            return
+
+        kept = (record_id for record_id in self.ids if record_id not in self.removed)
+        self.ids = array('Q', sorted(itertools.chain(kept, self.added)))
+
+        self.added.clear()
+        self.removed.clear()
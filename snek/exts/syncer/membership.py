@@ -0,0 +1,106 @@
+import typing as t
+
+import discord
+
+
+class MembershipIndex:
+    """
+    The guilds each cached user is a member of, and their roles in each of those guilds.
+
+    The index is built from the cache in a single pass over the members of every guild and then
+    kept up to date from member events, so the guilds and roles of a user are found without
+    scanning every guild the bot is in. The members of each guild are indexed too, so a guild is
+    replaced or removed without scanning every user.
+    """
+
+    def __init__(self) -> None:
+        # Role IDs of each user by guild ID, by user ID
+        self.memberships: t.Dict[int, t.Dict[int, t.Tuple[int, ...]]] = dict()
+
+        # IDs of the members of each guild, by guild ID
+        self.members: t.Dict[int, t.Set[int]] = dict()
+
+    def build(self, guilds: t.Iterable[discord.Guild]) -> None:
+        """Replace the index with the members of `guilds`."""
+        memberships, members = dict(), dict()
+        for guild in guilds:
+            guild_members = members[guild.id] = set()
+
+            for member in guild.members:
+                if (user_memberships := memberships.get(member.id)) is None:
+                    user_memberships = memberships[member.id] = dict()
+
+                user_memberships[guild.id] = tuple(role.id for role in member.roles)
+                guild_members.add(member.id)
+
+        self.memberships, self.members = memberships, members
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.memberships
+
+    def __len__(self) -> int:
+        return len(self.memberships)
+
+    def guild_ids(self, user_id: int) -> t.Tuple[int, ...]:
+        """Return the sorted IDs of the guilds the user is a member of."""
+        return tuple(sorted(self.memberships.get(user_id, ())))
+
+    def role_ids(self, user_id: int) -> t.Tuple[int, ...]:
+        """Return the sorted IDs of the roles of the user across all of its guilds."""
+        return tuple(sorted(
+            role_id
+            for role_ids in self.memberships.get(user_id, dict()).values()
+            for role_id in role_ids
+        ))
+
+    def _add(self, user_id: int, guild_id: int, role_ids: t.Tuple[int, ...]) -> None:
+        if (user_memberships := self.memberships.get(user_id)) is None:
+            user_memberships = self.memberships[user_id] = dict()
+
+        user_memberships[guild_id] = role_ids
+        self.members.setdefault(guild_id, set()).add(user_id)
+
+    def add(self, member: discord.Member) -> None:
+        """Add or update the membership of `member` in its guild, e.g. when it joins or its roles change."""
+        self._add(member.id, member.guild.id, tuple(role.id for role in member.roles))
+
+    def add_guild(self, guild: discord.Guild) -> None:
+        """Replace the memberships in `guild` with its members, e.g. once it's joined."""
+        self.remove_guild(guild.id)
+
+        for member in guild.members:
+            self._add(member.id, guild.id, tuple(role.id for role in member.roles))
+
+    def remove_guild(self, guild_id: int) -> None:
+        """Remove every membership in the guild, e.g. once it's left."""
+        for user_id in self.members.pop(guild_id, ()):
+            self._remove_user_membership(user_id, guild_id)
+
+    def remove(self, member: discord.Member) -> None:
+        """Remove the membership of `member` in its guild, e.g. when it leaves."""
+        self.remove_membership(member.id, member.guild.id)
+
+    def remove_membership(self, user_id: int, guild_id: int) -> None:
+        """Remove the membership of the user in the guild, dropping the user once it has no guilds left."""
+        if (guild_members := self.members.get(guild_id)) is not None:
+            guild_members.discard(user_id)
+
+        self._remove_user_membership(user_id, guild_id)
+
+    def _remove_user_membership(self, user_id: int, guild_id: int) -> None:
+        if (user_memberships := self.memberships.get(user_id)) is None:
+            return
+
+        user_memberships.pop(guild_id, None)
+        if not user_memberships:
+            del self.memberships[user_id]
+
+    def remove_role(self, role: discord.Role) -> None:
+        """Remove a deleted role from the members of its guild."""
+        guild_id = role.guild.id
+
+        for user_id in self.members.get(guild_id, ()):
+            user_memberships = self.memberships[user_id]
+
+            if role.id in (role_ids := user_memberships[guild_id]):
+                user_memberships[guild_id] = tuple(role_id for role_id in role_ids if role_id != role.id)
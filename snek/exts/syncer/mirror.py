@@ -0,0 +1,55 @@
+import asyncio
+from collections import namedtuple
+import contextlib
+import typing as t
+
+# The roles and guilds of a user as they are in the database
+UserState = namedtuple('UserState', ('roles', 'guilds'))
+
+
+class UserStateMirror:
+    """
+    The roles and guilds of each user as they are in the database.
+
+    The mirror is seeded with the users fetched by the user syncer and updated with every write,
+    so the member listeners can work out the new roles and guilds of a user without fetching it.
+    Changes to a user are serialised with `lock`, so concurrent events don't overwrite each other.
+    """
+
+    def __init__(self) -> None:
+        self.states: t.Dict[int, UserState] = dict()
+        self.locks: t.Dict[int, asyncio.Lock] = dict()
+
+        # How many callers are holding or waiting for the lock of each user
+        self.lock_users: t.Dict[int, int] = dict()
+
+    def load(self, states: t.Dict[int, UserState]) -> None:
+        """Replace the mirrored users with `states`, e.g. all those fetched by a synchronisation."""
+        self.states = states
+
+    def get(self, user_id: int) -> t.Optional[UserState]:
+        """Return the state of the user, or None if it isn't mirrored."""
+        return self.states.get(user_id)
+
+    def set(self, user_id: int, roles: t.Iterable[int], guilds: t.Iterable[int]) -> None:
+        self.states[user_id] = UserState(tuple(roles), tuple(guilds))
+
+    def discard(self, user_id: int) -> None:
+        """Forget the state of the user, e.g. when a write of it failed and its state is unknown."""
+        self.states.pop(user_id, None)
+
+    @contextlib.asynccontextmanager
+    async def lock(self, user_id: int) -> t.AsyncIterator[None]:
+        """Hold the lock of the user, which is dropped again once nobody is holding or waiting for it."""
+        if (lock := self.locks.get(user_id)) is None:
+            lock = self.locks[user_id] = asyncio.Lock()
+
+        self.lock_users[user_id] = self.lock_users.get(user_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self.lock_users[user_id] -= 1
+            if not self.lock_users[user_id]:
+                del self.lock_users[user_id]
+                del self.locks[user_id]
@@ -0,0 +1,135 @@
+import asyncio
+import bisect
+import json
+import logging
+import math
+import pathlib
+import time
+import typing as t
+
+import discord
+
+from snek.api.config import from_env
+from snek.exts.syncer.checkpoint import write_json
+
+log = logging.getLogger(__name__)
+
+CURSOR_VERSION = 1
+
+
+class ReconcileConfig(t.NamedTuple):
+    """
+    Background reconciliation of the database with the cache, a few guilds at a time.
+
+    Every `reconcile_interval` seconds, the next slice of guilds by ID is synchronised, sized so
+    every guild is reconciled about once per `reconcile_period` seconds. The last reconciled guild
+    is kept at `reconcile_cursor_path`, so a restart carries on where it left off. An interval of 0
+    disables the reconciliation. Its requests go through the background lane of the API client,
+    whose rate is limited by `SNEK_API_BACKGROUND_RATE`.
+    """
+
+    reconcile_interval: float = 60.0
+    reconcile_period: float = 6 * 60 * 60.0
+    reconcile_cursor_path: str = 'data/reconcile_cursor.json'
+
+    @classmethod
+    def from_env(cls) -> 'ReconcileConfig':
+        """Create a config from `SNEK_SYNC_*` environment variables, falling back to the defaults."""
+        return from_env(cls, prefix='SNEK_SYNC_')
+
+
+class Reconciler:
+    """Synchronise slices of the guilds in the cache in turn with `sync`, which takes the IDs of a slice."""
+
+    def __init__(
+        self,
+        config: ReconcileConfig,
+        guilds: t.Callable[[], t.Iterable[discord.Guild]],
+        sync: t.Callable[[t.Set[int]], t.Awaitable[None]]
+    ) -> None:
+        self.config = config
+        self.guilds = guilds
+        self.sync = sync
+
+        self.path = pathlib.Path(config.reconcile_cursor_path) if config.reconcile_cursor_path else None
+
+        # The ID of the last reconciled guild, or None to start from the first one
+        self.cursor: t.Optional[int] = None
+
+        self.slices = 0
+        self.reconciled = 0
+
+    def slice_size(self, guild_count: int) -> int:
+        """Return how many guilds to reconcile per interval to cover all `guild_count` of them per period."""
+        return max(1, math.ceil(guild_count * self.config.reconcile_interval / self.config.reconcile_period))
+
+    def next_slice(self, guild_ids: t.List[int]) -> t.List[int]:
+        """Return the IDs of the guilds following the cursor in the sorted `guild_ids`, wrapping around."""
+        size = min(len(guild_ids), self.slice_size(len(guild_ids)))
+        start = 0 if self.cursor is None else bisect.bisect_right(guild_ids, self.cursor)
+
+        chosen = guild_ids[start:start + size]
+        return chosen + guild_ids[:size - len(chosen)]
+
+    def _read_cursor(self) -> t.Optional[int]:
+        try:
+            with self.path.open(encoding='utf-8') as file:
+                cursor = json.load(file)
+
+            if cursor['version'] != CURSOR_VERSION:
+                return None
+
+            return int(cursor['guild']) if cursor['guild'] is not None else None
+
+        except FileNotFoundError:
+            return None
+
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            log.warning(f'Starting the reconciliation over, as its cursor could not be read: {err!r}')
+            return None
+
+    async def load_cursor(self) -> None:
+        if self.path is not None:
+            self.cursor = await asyncio.get_event_loop().run_in_executor(None, self._read_cursor)
+
+    async def save_cursor(self) -> None:
+        if self.path is None:
+            return
+
+        cursor = {'version': CURSOR_VERSION, 'guild': self.cursor, 'saved_at': time.time()}
+
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, write_json, self.path, cursor)
+        except OSError as err:
+            log.warning(f'Could not write the reconciliation cursor: {err!r}')
+
+    async def reconcile(self) -> None:
+        """Synchronise the next slice of guilds and move the cursor past it."""
+        guild_ids = sorted(guild.id for guild in self.guilds())
+        if not guild_ids:
+            return
+
+        chosen = self.next_slice(guild_ids)
+        log.debug(f'Reconciling {len(chosen)}/{len(guild_ids)} guilds, from guild {chosen[0]}.')
+
+        await self.sync(set(chosen))
+
+        self.cursor = chosen[-1]
+        self.slices += 1
+        self.reconciled += len(chosen)
+
+        await self.save_cursor()
+
+    async def run(self) -> None:
+        """Reconcile a slice of guilds every interval, until cancelled."""
+        await self.load_cursor()
+
+        while True:
+            started = time.monotonic()
+
+            try:
+                await self.reconcile()
+            except Exception:
+                log.exception('Background reconciliation failed!')
+
+            await asyncio.sleep(max(0.0, self.config.reconcile_interval - (time.monotonic() - started)))
@@ -0,0 +1,204 @@
+from array import array
+import bisect
+import itertools
+import typing as t
+
+# Kinds of columns, by the values of the record field they hold
+INT = 'int'
+STR = 'str'
+UNIQUE_STR = 'unique_str'
+IDS = 'ids'
+
+
+def spans(offsets: array) -> t.Iterator[t.Tuple[int, int]]:
+    """Yield the start and end of each value from the `offsets` of a column."""
+    return zip(offsets, itertools.islice(offsets, 1, None))
+
+
+class IntColumn:
+    """Integers, e.g. snowflakes, colors or permissions, in a typed array."""
+
+    def __init__(self) -> None:
+        self.values = array('q')
+
+    def append(self, value: int) -> None:
+        self.values.append(value)
+
+    def get(self, row: int) -> int:
+        return self.values[row]
+
+    def __iter__(self) -> t.Iterator[int]:
+        return iter(self.values)
+
+    def reorder(self, order: t.Sequence[int]) -> None:
+        self.values = array('q', (self.values[row] for row in order))
+
+
+class StrColumn:
+    """
+    Strings encoded back to back in a single buffer and found by their offsets.
+
+    With `dedupe`, rows holding an equal string share it. The lookup table used to find equal
+    strings is dropped by `freeze`, since no string is added anymore once the store is built.
+    """
+
+    def __init__(self, dedupe: bool = True) -> None:
+        self.data = bytearray()
+        self.offsets = array('q', (0,))
+
+        # The string of each row, by its index in `offsets`. Strings aren't shared without dedupe.
+        self.rows: t.Optional[array] = array('q') if dedupe else None
+        self.lookup: t.Optional[t.Dict[str, int]] = dict() if dedupe else None
+
+    def _add(self, value: str) -> int:
+        self.data += value.encode()
+        self.offsets.append(len(self.data))
+        return len(self.offsets) - 2
+
+    def append(self, value: str) -> None:
+        if self.rows is None:
+            self._add(value)
+            return
+
+        if (index := self.lookup.get(value)) is None:
+            index = self.lookup[value] = self._add(value)
+
+        self.rows.append(index)
+
+    def get(self, row: int) -> str:
+        index = row if self.rows is None else self.rows[row]
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode()
+
+    def __iter__(self) -> t.Iterator[str]:
+        data, offsets = memoryview(self.data), self.offsets
+
+        if self.rows is not None:
+            return (str(data[offsets[index]:offsets[index + 1]], 'utf-8') for index in self.rows)
+
+        return (str(data[start:end], 'utf-8') for start, end in spans(offsets))
+
+    def reorder(self, order: t.Sequence[int]) -> None:
+        if self.rows is not None:
+            self.rows = array('q', (self.rows[row] for row in order))
+            return
+
+        data, offsets = bytearray(), array('q', (0,))
+        for row in order:
+            data += self.data[self.offsets[row]:self.offsets[row + 1]]
+            offsets.append(len(data))
+
+        self.data, self.offsets = data, offsets
+
+    def freeze(self) -> None:
+        self.lookup = None
+
+
+class IDsColumn:
+    """Tuples of IDs, e.g. role IDs, stored back to back in a single array and found by their offsets."""
+
+    def __init__(self) -> None:
+        self.values = array('q')
+        self.offsets = array('q', (0,))
+
+    def append(self, value: t.Iterable[int]) -> None:
+        self.values.extend(value)
+        self.offsets.append(len(self.values))
+
+    def get(self, row: int) -> t.Tuple[int, ...]:
+        return tuple(self.values[self.offsets[row]:self.offsets[row + 1]])
+
+    def __iter__(self) -> t.Iterator[t.Tuple[int, ...]]:
+        values = self.values
+        return (tuple(values[start:end]) for start, end in spans(self.offsets))
+
+    def reorder(self, order: t.Sequence[int]) -> None:
+        values, offsets = array('q'), array('q', (0,))
+        for row in order:
+            values.extend(self.values[self.offsets[row]:self.offsets[row + 1]])
+            offsets.append(len(values))
+
+        self.values, self.offsets = values, offsets
+
+
+COLUMNS = {
+    INT: IntColumn,
+    STR: StrColumn,
+    UNIQUE_STR: lambda: StrColumn(dedupe=False),
+    IDS: IDsColumn
+}
+
+
+class RecordStore(t.Mapping[int, tuple]):
+    """
+    A read-only mapping of namedtuple records by ID, stored by column instead of as Python objects.
+
+    Each field of `record_type` is kept in a column of the matching kind in `kinds`: integers in
+    typed arrays, strings in byte buffers and tuples of IDs in offset-indexed arrays. The first
+    field must be the integer `id`. Records are sorted by ID once built, so they're looked up by
+    bisection and iterated in order, and each one is only created when it's accessed.
+    """
+
+    def __init__(self, record_type: t.Type[tuple], kinds: t.Sequence[str], records: t.Iterable[tuple]) -> None:
+        if record_type._fields[0] != 'id' or kinds[0] != INT:
+            raise ValueError('The first field of the records must be an integer ID.')
+
+        self.record_type = record_type
+        self.columns = tuple(COLUMNS[kind]() for kind in kinds)
+
+        for record in records:
+            for column, value in zip(self.columns, record):
+                column.append(value)
+
+        self._sort()
+
+        for column in self.columns:
+            if isinstance(column, StrColumn):
+                column.freeze()
+
+    @property
+    def ids(self) -> array:
+        return self.columns[0].values
+
+    def _sort(self) -> None:
+        ids = self.ids
+        if all(ids[row] < ids[row + 1] for row in range(len(ids) - 1)):
+            return
+
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        for column in self.columns:
+            column.reorder(order)
+
+        ids = self.ids
+        if any(ids[row] == ids[row + 1] for row in range(len(ids) - 1)):
+            raise ValueError('Records must have unique IDs.')
+
+    def _row(self, record_id: int) -> t.Optional[int]:
+        row = bisect.bisect_left(self.ids, record_id)
+        return row if row < len(self.ids) and self.ids[row] == record_id else None
+
+    def record(self, row: int) -> tuple:
+        """Return the record in `row`."""
+        return self.record_type(*(column.get(row) for column in self.columns))
+
+    def __getitem__(self, record_id: int) -> tuple:
+        if not isinstance(record_id, int) or (row := self._row(record_id)) is None:
+            raise KeyError(record_id)
+
+        return self.record(row)
+
+    def __contains__(self, record_id: object) -> bool:
+        return isinstance(record_id, int) and self._row(record_id) is not None
+
+    def __iter__(self) -> t.Iterator[int]:
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def values(self) -> t.Iterator[tuple]:
+        """Iterate over the records by ID, in order."""
+        return itertools.starmap(self.record_type, zip(*self.columns))
+
+    def items(self) -> t.Iterator[t.Tuple[int, tuple]]:
+        """Iterate over the IDs and records by ID, in order."""
+        return zip(self.ids, self.values())
@@ -0,0 +1,97 @@
+from enum import Enum
+import logging
+import time
+import typing as t
+
+from snek.api.config import from_env
+
+log = logging.getLogger(__name__)
+
+
+class SyncMode(Enum):
+    """How much of the cache is synchronised when the bot is ready."""
+
+    # Nothing, as hardly any events can have been missed
+    SKIP = 'skip'
+    # Records which changed since the last synchronisation, as far as the checkpoint allows
+    PARTIAL = 'partial'
+    # Every record, against the whole database
+    FULL = 'full'
+
+
+class ResumeConfig(t.NamedTuple):
+    """
+    When a ready event after a reconnection calls for a synchronisation.
+
+    The events missed while disconnected are estimated from the rate of events the syncer processed
+    since its last synchronisation. The synchronisation is skipped if the gap is at most
+    `resume_skip_gap` seconds and at most `resume_skip_events` events were missed, and is only a full
+    one past `resume_full_gap` seconds or `resume_full_events` missed events.
+    """
+
+    resume_skip_gap: float = 60.0
+    resume_skip_events: float = 5.0
+    resume_full_gap: float = 30 * 60.0
+    resume_full_events: float = 5000.0
+
+    @classmethod
+    def from_env(cls) -> 'ResumeConfig':
+        """Create a config from `SNEK_SYNC_*` environment variables, falling back to the defaults."""
+        return from_env(cls, prefix='SNEK_SYNC_')
+
+
+class ResumeTracker:
+    """Track synchronisations, disconnections and processed events to pick the mode of the next synchronisation."""
+
+    def __init__(self, config: ResumeConfig) -> None:
+        self.config = config
+
+        self.synced_at: t.Optional[float] = None
+        self.disconnected_at: t.Optional[float] = None
+
+        # Events processed since the last synchronisation
+        self.events = 0
+
+    def event(self) -> None:
+        """Count an event processed by a listener of the syncer."""
+        self.events += 1
+
+    def disconnected(self) -> None:
+        """Note the start of a disconnection, unless one is ongoing already."""
+        if self.disconnected_at is None:
+            self.disconnected_at = time.monotonic()
+
+    def resumed(self) -> None:
+        """Note that the disconnection is over without any event missed, or with the missed ones left for later."""
+        self.disconnected_at = None
+
+    def synced(self) -> None:
+        """Note that a synchronisation of everything is finished."""
+        self.synced_at = time.monotonic()
+        self.disconnected_at = None
+        self.events = 0
+
+    def missed_events(self, gap: float) -> float:
+        """Estimate how many events were missed during `gap` seconds from the rate of events before it."""
+        connected = self.disconnected_at - self.synced_at
+        return gap * self.events / connected if connected > 0 else 0.0
+
+    def mode(self) -> t.Tuple[SyncMode, str]:
+        """Return the mode of the synchronisation to run now that the bot is ready, with why it was picked."""
+        if self.synced_at is None:
+            return SyncMode.PARTIAL, 'no synchronisation finished since the start'
+
+        if self.disconnected_at is None:
+            return SyncMode.PARTIAL, 'the bot was ready again without a disconnection'
+
+        gap = time.monotonic() - self.disconnected_at
+        missed = self.missed_events(gap)
+        reason = f'{gap:.0f}s disconnected, about {missed:.0f} events missed'
+
+        if gap > self.config.resume_full_gap or missed > self.config.resume_full_events:
+            return SyncMode.FULL, reason
+
+        if gap <= self.config.resume_skip_gap and missed <= self.config.resume_skip_events:
+            return SyncMode.SKIP, reason
+
+        return SyncMode.PARTIAL, reason
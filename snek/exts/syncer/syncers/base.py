@@ -1,57 +1,344 @@
 from abc import ABC, abstractmethod
-from collections import namedtuple
+import asyncio
+from array import array
+import itertools
 import logging
 import typing as t
 
+import aiohttp
+import discord
 from discord.ext.commands import Context
 
-from snek.api import ResponseCodeError
+from snek.api import BulkWriteError, CircuitOpenError, Priority, request_priority, ResponseCodeError
 from snek.bot import Snek
+from snek.exts.syncer.checkpoint import record_hash, SyncCheckpoint
+from snek.exts.syncer.diff import Diff, iter_records, merge_diff, RecordID, UnsortedRecordsError
+from snek.exts.syncer.known_ids import KnownIDs
+from snek.exts.syncer.records import RecordStore
 
 log = logging.getLogger(__name__)
 
-Diff = namedtuple('Diff', ('created', 'updated', 'deleted'))
+# The IDs of the guilds a synchronisation is limited to, or None for all of them
+Scope = t.Optional[t.AbstractSet[int]]
 
 
 class ObjectSyncerABC(ABC):
     """Base class for synchronising the database with Discord objects in the cache."""
 
-    def __init__(self, bot: Snek) -> None:
+    def __init__(self, bot: Snek, checkpoint: t.Optional[SyncCheckpoint] = None) -> None:
         self.bot = bot
+        self.checkpoint = checkpoint
+
+        # Loaded by `get_diff` and kept up to date by `write`
+        self.known_ids = KnownIDs()
+
+        # Whether the Snek API lists the records by ID when asked to, so they can be merged as they arrive
+        self.sorted_pages = True
 
     @property
     @abstractmethod
     def name(self) -> str:
         """The name of the syncer."""
 
+    @property
+    @abstractmethod
+    def endpoint(self) -> str:
+        """The Snek API list endpoint of the records."""
+
+    # Whether records in the database which aren't in the cache are deleted
+    deletes = False
+
+    @abstractmethod
+    def cache_records(self, scope: Scope = None) -> t.Mapping[int, tuple]:
+        """Return the records of the objects in the cache by ID, for the guilds in `scope` only if given."""
+
     @abstractmethod
-    async def get_diff(self) -> None:
-        """Return the difference between the cache and the database."""
+    def db_record(self, data: t.Dict) -> tuple:
+        """Return the record of an object from its Snek API representation."""
 
     @abstractmethod
     async def sync_diff(self, diff: Diff) -> None:
         """Perform the API calls for synchronisation."""
 
-    async def sync(self, ctx: t.Optional[Context] = None) -> None:
-        """Perform the synchronisation."""
-        log.info(f'Starting the {self.name} syncer..')
+    def observe(self, records: t.Iterable[tuple], replace: bool = False) -> None:
+        """
+        Take note of `records` as they are in the database, e.g. fetched by a diff or written by a sync.
+
+        If `replace` is True, these are all the records known to be in the database. Does nothing by default.
+        """
+
+    def record_adjuster(self) -> t.Optional[t.Callable[[tuple, tuple], tuple]]:
+        """
+        Return how to complete a record of the cache from its record in the database, or None if they're complete.
+
+        Diffs compare and write the completed records, e.g. to keep what the cache doesn't know about yet.
+        """
+        return None
+
+    def cache_guilds(self, scope: Scope = None) -> t.List[discord.Guild]:
+        """Return the guilds in the cache, only those in `scope` if given."""
+        return [guild for guild in self.bot.guilds if scope is None or guild.id in scope]
+
+    async def scope_db_records(self, cache_records: t.Mapping[int, tuple], scope: Scope) -> t.Dict[int, tuple]:
+        """
+        Return the records in the database which a diff limited to the guilds in `scope` compares to.
+
+        These are the records of the objects in the cache, which are looked up by ID. Syncers which
+        delete records must also return the records of the guilds which aren't in the cache anymore.
+        """
+        return await self._look_up(cache_records)
+
+    async def _look_up(self, record_ids: t.Iterable[int], skip_missing: bool = True) -> t.Dict[int, tuple]:
+        """
+        Return the records found in the database for `record_ids` by ID.
+
+        IDs known to be missing from the database aren't looked up, unless `skip_missing` is False.
+        """
+        async def look_up(record_id: int) -> t.Optional[tuple]:
+            if skip_missing and self.known_ids.exists(record_id) is False:
+                return None
+
+            try:
+                return self.db_record(await self.bot.api_client.load(self.endpoint, record_id))
+            except ResponseCodeError as err:
+                if err.status != 404:
+                    raise
+                return None
+
+        return {
+            record.id: record
+            for record in await asyncio.gather(*(look_up(record_id) for record_id in record_ids))
+            if record is not None
+        }
+
+    async def get_diff(self, use_checkpoint: bool = False, scope: Scope = None) -> Diff:
+        """
+        Return the difference between the cache and the database.
+
+        With a `scope`, only the records of those guilds are diffed. Otherwise, with `use_checkpoint` and
+        a valid checkpoint for this syncer, only records whose content changed since the last
+        synchronisation are diffed. The whole database is fetched if neither applies.
+        """
+        log.trace(f'Getting the diff for {self.name}s..')
+        cache_records = self.cache_records(scope)
+        hashes = {record_id: record_hash(record) for record_id, record in cache_records.items()}
+        if (adjust := self.record_adjuster()) is not None:
+            adjust = hashing_adjuster(adjust, hashes)
+
+        if scope is not None:
+            db_records = await self.scope_db_records(cache_records, scope)
+            for record_id in db_records:
+                self.known_ids.add(record_id)
+            self.observe(db_records.values())
+
+            db_stream = iter_records(sorted_records(db_records))
+            diff = await merge_diff(sorted_records(cache_records), db_stream, self.deletes, adjust)
+            return diff._replace(hashes=hashes, scope=frozenset(scope))
+
+        if use_checkpoint and self.checkpoint is not None:
+            if (checkpoint := await self.checkpoint.load(self.name)) is not None:
+                return await self._checkpoint_diff(cache_records, hashes, checkpoint, adjust)
+
+        diff = None
+        if self.sorted_pages:
+            db_ids = array('Q')
+            db_stream = self._db_records(db_ids)
+            try:
+                diff = await merge_diff(sorted_records(cache_records), db_stream, self.deletes, adjust)
+            except UnsortedRecordsError as err:
+                log.info(f'Sorting {self.name}s after fetching them, as the Snek API listed them out of order: {err}')
+                self.sorted_pages = False
+            finally:
+                # Close the stream of pages if the merge stopped early
+                await db_stream.aclose()
+
+        if diff is None:
+            db_ids = array('Q')
+            db_records = [record async for record in self._db_records(db_ids)]
+            db_records.sort(key=lambda record: record.id)
+            diff = await merge_diff(sorted_records(cache_records), iter_records(db_records), self.deletes, adjust)
+
+        self.known_ids.load(db_ids)
+        return diff._replace(hashes=hashes)
+
+    async def _db_records(self, db_ids: array) -> t.AsyncIterator[tuple]:
+        """Yield the records in the database page by page, adding their IDs to `db_ids` as they go by."""
+        self.observe((), replace=True)
+
+        params = {'ordering': 'id'} if self.sorted_pages else None
+        async for page in self.bot.api_client.iter_pages(self.endpoint, params=params):
+            records = [self.db_record(data) for data in page]
+
+            db_ids.extend(record.id for record in records)
+            self.observe(records)
+
+            for record in records:
+                yield record
+
+    async def _checkpoint_diff(
+        self,
+        cache_records: t.Mapping[int, tuple],
+        hashes: t.Dict[int, str],
+        checkpoint: t.Dict[int, str],
+        adjust: t.Optional[t.Callable[[tuple, tuple], tuple]] = None
+    ) -> Diff:
+        """
+        Diff the records whose hash differs from the checkpoint, which was in sync with the database.
+
+        Records missing from the checkpoint are looked up in the database, as they may have
+        been created since (e.g. by the listeners) and can't be told apart from new ones otherwise.
+        With `adjust`, every changed record is looked up, to be completed from the database.
+        """
+        changed = {
+            record_id: record for record_id, record in cache_records.items()
+            if hashes[record_id] != checkpoint.get(record_id)
+        }
+        unknown_ids = [record_id for record_id in changed if adjust is not None or record_id not in checkpoint]
+        # The known IDs may predate records created since, so they don't tell which ones are missing
+        found = await self._look_up(unknown_ids, skip_missing=False)
+
+        self.known_ids.load(checkpoint.keys() | found.keys())
+
+        # The checkpoint holds the hashes of the records as completed by `adjust`, so unchanged ones are complete
+        unchanged = (record for record_id, record in cache_records.items() if record_id not in changed)
+        self.observe(itertools.chain(unchanged, found.values()), replace=True)
+
+        created, updated = set(), set()
+        for record_id, record in changed.items():
+            if record_id in found:
+                if adjust is not None:
+                    record = adjust(record, found[record_id])
+                if found[record_id] != record:
+                    updated.add(record)
+            elif record_id in checkpoint and adjust is None:
+                updated.add(record)
+            else:
+                created.add(record)
+
+        deleted = None
+        if self.deletes:
+            deleted = {RecordID(record_id) for record_id in checkpoint.keys() - cache_records.keys()}
+
+        log.debug(
+            f'{self.name.capitalize()} diff from the checkpoint: {len(changed)}/{len(cache_records)} records '
+            f'changed, {len(unknown_ids)} of them looked up.'
+        )
+        return Diff(created, updated, deleted, hashes, from_checkpoint=True)
+
+    async def write(self, method: str, endpoint: str, records: t.Iterable[tuple]) -> None:
+        """Write the namedtuple `records` in bulk, raising BulkWriteError if any of them failed."""
+        records = list(records)
+        result = await self.bot.api_client.bulk(method, endpoint, [record._asdict() for record in records])
+
+        # Records which are already gone don't need to be deleted
+        failed = [(record, err) for record, err in result.failed if not (method == 'DELETE' and err.status == 404)]
+
+        failed_ids = {record['id'] for record, _ in failed}
+        written = [record for record in records if record.id not in failed_ids]
+
+        for record in written:
+            if method == 'POST':
+                self.known_ids.add(record.id)
+            elif method == 'DELETE':
+                self.known_ids.discard(record.id)
+
+        if method != 'DELETE':
+            self.observe(written)
+
+        if failed:
+            raise BulkWriteError(endpoint, len(records) - len(failed), failed)
+
+    async def sync(
+        self,
+        ctx: t.Optional[Context] = None,
+        diff: t.Optional[t.Awaitable[Diff]] = None,
+        priority: Priority = Priority.BULK
+    ) -> bool:
+        """
+        Perform the synchronisation, sending its requests in the lane of `priority` of the API client.
+
+        `diff` may be given as an awaitable of a diff which is already being computed, e.g. a task
+        started while another syncer was still writing. Otherwise the diff is computed here.
+        Return whether the synchronisation succeeded.
+        """
+        # Background synchronisations run all the time, so they're only logged when debugging
+        level = logging.DEBUG if priority is Priority.BACKGROUND else logging.INFO
+        log.log(level, f'Starting the {self.name} syncer..')
 
         msg = mention = ''
+        succeeded = False
         if ctx:
             msg = await ctx.send(f'📊 Synchronising {self.name}s..')
             mention = ctx.author.mention
 
         try:
-            await self.sync_diff(await self.get_diff())
+            with request_priority(priority):
+                diff = await (diff if diff is not None else self.get_diff())
+                await self.sync_diff(diff)
+
         except ResponseCodeError as err:
             log.exception(f'{self.name.capitalize()} syncer failed!')
 
             results = f'Status {err.status}\n```{err.response_json or "See log output for details."}```'
             status = f'❌ {mention} {self.name.capitalize()} synchronisation failed: {results}'
 
+        except BulkWriteError as err:
+            log.error(f'{self.name.capitalize()} syncer failed: {err}')
+            status = f'❌ {mention} {self.name.capitalize()} synchronisation failed: {err}'
+
+            # The database didn't match the checkpoint, so it can't be trusted anymore
+            if isinstance(diff, Diff) and diff.from_checkpoint:
+                await self.checkpoint.discard(self.name)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            log.error(f'{self.name.capitalize()} syncer failed to reach the Snek API: {err!r}')
+            status = f'❌ {mention} {self.name.capitalize()} synchronisation failed: could not reach the Snek API.'
+
+        except CircuitOpenError as err:
+            log.warning(f'{self.name.capitalize()} syncer aborted: {err}')
+            status = f'❌ {mention} {self.name.capitalize()} synchronisation aborted: {err}'
+
         else:
-            log.info(f'The {self.name} syncer is finished.')
+            log.log(level, f'The {self.name} syncer is finished.')
             status = f'✅ Synchronisation of {self.name}s is complete.'
+            succeeded = True
+
+            if self.checkpoint is not None and diff.hashes is not None:
+                if diff.scope is None:
+                    await self.checkpoint.save(self.name, diff.hashes)
+                else:
+                    removed = (record.id for record in diff.deleted or ())
+                    await self.checkpoint.update(self.name, diff.hashes, removed)
 
         if msg:
             await msg.edit(content=status)
+
+        return succeeded
+
+
+def hashing_adjuster(
+    adjust: t.Callable[[tuple, tuple], tuple],
+    hashes: t.Dict[int, str]
+) -> t.Callable[[tuple, tuple], tuple]:
+    """
+    Wrap `adjust` to hash the records it completes into `hashes`.
+
+    The checkpoint then holds the hashes of the records as they're written, so a record of the
+    cache which still lacks what was taken from the database isn't considered unchanged later on.
+    """
+    def adjust_and_hash(record: tuple, db_record: tuple) -> tuple:
+        record = adjust(record, db_record)
+        hashes[record.id] = record_hash(record)
+        return record
+
+    return adjust_and_hash
+
+
+def sorted_records(records: t.Mapping[int, tuple]) -> t.Iterator[tuple]:
+    """Yield the values of `records` by ID, in order."""
+    if isinstance(records, RecordStore):
+        yield from records.values()
+        return
+
+    for record_id in sorted(records):
+        yield records[record_id]
@@ -1,53 +1,69 @@
+import asyncio
 from collections import namedtuple
 import logging
+import typing as t
 
-from snek.exts.syncer.syncers.base import Diff, ObjectSyncerABC
+from snek.api import gather_writes, ResponseCodeError
+from snek.exts.syncer.records import INT, RecordStore, STR, UNIQUE_STR
+from snek.exts.syncer.syncers.base import Diff, ObjectSyncerABC, Scope
 
 log = logging.getLogger(__name__)
 
 Guild = namedtuple('Guild', ('id', 'name', 'created_at', 'icon_url'))
+GUILD_COLUMNS = (INT, STR, UNIQUE_STR, UNIQUE_STR)
 
 
 class GuildSyncer(ObjectSyncerABC):
     """Synchronise the database with guilds in the cache."""
     name = 'guild'
+    endpoint = 'guilds'
 
-    async def get_diff(self) -> Diff:
-        """Return the difference between the cache of guilds and the database."""
-        log.trace('Getting the diff for guilds..')
-        guilds = await self.bot.api_client.get('guilds')
+    def cache_records(self, scope: Scope = None) -> RecordStore:
+        """Return the guilds in the cache by ID."""
+        return RecordStore(Guild, GUILD_COLUMNS, (
+            (guild.id, guild.name, str(guild.created_at), str(guild.icon_url))
+            for guild in self.cache_guilds(scope)
+        ))
 
-        db_guilds = {Guild(**guild) for guild in guilds}
-        cache_guilds = {
-            Guild(
-                id=guild.id,
-                name=guild.name,
-                created_at=str(guild.created_at),
-                icon_url=str(guild.icon_url)
-            )
-            for guild in self.bot.guilds
-        }
+    def db_record(self, data: t.Dict) -> Guild:
+        return Guild(**data)
 
-        db_guild_ids = {guild.id for guild in db_guilds}
-        cache_guild_ids = {guild.id for guild in cache_guilds}
+    async def sync_diff(self, diff: Diff) -> None:
+        """
+        Synchronise the database with the guilds in the cache, and load the configs of the guilds.
 
-        new_guild_ids = cache_guild_ids - db_guild_ids
+        Every config is fetched again by a full synchronisation. Scoped ones, e.g. a joined guild or
+        a slice of the reconciler, only fetch the configs of the created guilds and of the guilds in
+        scope whose config isn't loaded yet.
+        """
+        log.trace('Syncing created and updated guilds..')
+        await gather_writes(
+            self.write('POST', 'guilds', diff.created),
+            self.write('PUT', 'guilds', diff.updated)
+        )
 
-        guilds_to_create = {guild for guild in cache_guilds if guild.id in new_guild_ids}
-        guilds_to_update = cache_guilds - db_guilds - guilds_to_create
+        if diff.scope is None or self.bot.configs is None:
+            log.trace('Syncing all guild configs..')
+            configs = await self.bot.api_client.get('guild_configs')
+            self.bot.configs = {config['guild']: config for config in configs}
+            return
 
-        return Diff(guilds_to_create, guilds_to_update, None)
+        created_ids = {guild.id for guild in diff.created}
+        guild_ids = [
+            guild_id for guild_id in sorted(diff.scope)
+            if guild_id in created_ids or guild_id not in self.bot.configs
+        ]
 
-    async def sync_diff(self, diff: Diff) -> None:
-        """Synchronise the database with the guilds in the cache."""
-        log.trace('Syncing created guilds..')
-        for guild in diff.created:
-            await self.bot.api_client.post('guilds', json=guild._asdict())
-
-        log.trace('Syncing updated guilds..')
-        for guild in diff.updated:
-            await self.bot.api_client.put(f'guilds/{guild.id}', json=guild._asdict())
-
-        log.trace('Syncing all guild configs..')
-        configs = await self.bot.api_client.get('guild_configs')
-        self.bot.configs = {config['guild']: config for config in configs}
+        log.trace(f'Syncing the configs of {len(guild_ids)} guilds..')
+        for config in await asyncio.gather(*(self._get_config(guild_id) for guild_id in guild_ids)):
+            if config is not None:
+                self.bot.configs[config['guild']] = config
+
+    async def _get_config(self, guild_id: int) -> t.Optional[t.Dict]:
+        """Return the config of the guild, or None if it doesn't have one."""
+        try:
+            return await self.bot.api_client.get(f'guild_configs/{guild_id}')
+        except ResponseCodeError as err:
+            if err.status != 404:
+                raise
+            return None
@@ -1,59 +1,81 @@
 from collections import namedtuple
 import logging
+import typing as t
 
-from snek.exts.syncer.syncers.base import Diff, ObjectSyncerABC
+from snek.api import gather_writes
+from snek.exts.syncer.records import INT, RecordStore, STR, UNIQUE_STR
+from snek.exts.syncer.syncers.base import Diff, ObjectSyncerABC, Scope
 
 log = logging.getLogger(__name__)
 
 Role = namedtuple('Role', ('id', 'name', 'color', 'created_at', 'permissions', 'position', 'guild'))
+ROLE_COLUMNS = (INT, STR, INT, UNIQUE_STR, INT, INT, INT)
 
 
 class RoleSyncer(ObjectSyncerABC):
     """Synchronise the database with roles in the cache."""
     name = 'role'
+    endpoint = 'roles'
+    deletes = True
 
-    async def get_diff(self) -> Diff:
-        """Return the difference between the cache of roles and the database."""
-        log.trace('Getting the diff for roles..')
-        roles = await self.bot.api_client.get('roles')
-
-        db_roles = {Role(**role) for role in roles}
-        cache_roles = {
-            Role(
-                id=role.id,
-                name=role.name,
-                color=role.color.value,
-                created_at=str(role.created_at),
-                permissions=role.permissions.value,
-                position=role.position,
-                guild=guild.id
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        # Whether the Snek API lists the roles of a single guild when asked to, for scoped diffs
+        self.guild_filter = True
+
+    def cache_records(self, scope: Scope = None) -> RecordStore:
+        """Return the roles in the cache by ID."""
+        return RecordStore(Role, ROLE_COLUMNS, (
+            (
+                role.id,
+                role.name,
+                role.color.value,
+                str(role.created_at),
+                role.permissions.value,
+                role.position,
+                guild.id
             )
-            for guild in self.bot.guilds
+            for guild in self.cache_guilds(scope)
             for role in guild.roles
-        }
+        ))
 
-        db_role_ids = {role.id for role in db_roles}
-        cache_role_ids = {role.id for role in cache_roles}
+    def db_record(self, data: t.Dict) -> Role:
+        return Role(**data)
 
-        new_role_ids = cache_role_ids - db_role_ids
-        deleted_role_ids = db_role_ids - cache_role_ids
+    async def _list_roles(self, params: t.Optional[t.Dict] = None) -> t.List[Role]:
+        pages = self.bot.api_client.iter_pages(self.endpoint, params=params)
+        return [self.db_record(data) async for page in pages for data in page]
 
-        roles_to_create = {role for role in cache_roles if role.id in new_role_ids}
-        roles_to_update = cache_roles - db_roles - roles_to_create
-        roles_to_delete = {role for role in db_roles if role.id in deleted_role_ids}
+    async def scope_db_records(self, cache_records: t.Mapping[int, Role], scope: Scope) -> t.Dict[int, Role]:
+        """
+        Return the roles of the guilds in `scope` in the database, including those deleted since.
 
-        return Diff(roles_to_create, roles_to_update, roles_to_delete)
+        The roles of each guild are listed with the `guild` filter. Should the Snek API ignore it,
+        this is remembered and all roles are listed once for the guilds of the scope instead.
+        """
+        if self.guild_filter:
+            db_records = dict()
+            for guild_id in scope:
+                roles = await self._list_roles({'guild': guild_id})
 
-    async def sync_diff(self, diff: Diff) -> None:
-        """Synchronise the database with the roles in the cache."""
-        log.trace('Syncing created roles..')
-        for role in diff.created:
-            await self.bot.api_client.post('roles', json=role._asdict())
+                # Roles of other guilds would be deleted if the listing were taken as the roles of this guild
+                if any(role.guild != guild_id for role in roles):
+                    log.info('The Snek API ignores the guild filter of roles, listing all of them for scoped diffs.')
+                    self.guild_filter = False
+                    return {role.id: role for role in roles if role.guild in scope}
 
-        log.trace('Syncing updated roles..')
-        for role in diff.updated:
-            await self.bot.api_client.put(f'roles/{role.id}', json=role._asdict())
+                db_records.update((role.id, role) for role in roles)
 
-        log.trace('Syncing deleted roles..')
-        for role in diff.deleted:
-            await self.bot.api_client.delete(f'roles/{role.id}')
+            return db_records
+
+        return {role.id: role for role in await self._list_roles() if role.guild in scope}
+
+    async def sync_diff(self, diff: Diff) -> None:
+        """Synchronise the database with the roles in the cache."""
+        log.trace('Syncing created, updated and deleted roles..')
+        await gather_writes(
+            self.write('POST', 'roles', diff.created),
+            self.write('PUT', 'roles', diff.updated),
+            self.write('DELETE', 'roles', diff.deleted)
+        )
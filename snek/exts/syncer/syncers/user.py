@@ -1,70 +1,125 @@
 from collections import namedtuple
 import logging
+import typing as t
 
-from snek.exts.syncer.syncers.base import Diff, ObjectSyncerABC
+import discord
+
+from snek.api import gather_writes
+from snek.exts.syncer.membership import MembershipIndex
+from snek.exts.syncer.mirror import UserState, UserStateMirror
+from snek.exts.syncer.records import IDS, INT, RecordStore, STR, UNIQUE_STR
+from snek.exts.syncer.syncers.base import Diff, ObjectSyncerABC, Scope
 
 log = logging.getLogger(__name__)
 
 User = namedtuple('User', ('id', 'name', 'discriminator', 'created_at', 'avatar_url', 'roles', 'guilds'))
+USER_COLUMNS = (INT, STR, STR, UNIQUE_STR, STR, IDS, IDS)
 
 
 class UserSyncer(ObjectSyncerABC):
     """Synchronise the database with users in the cache."""
     name = 'user'
+    endpoint = 'users'
 
-    async def get_diff(self) -> Diff:
-        """Return the difference between the cache of users and the database."""
-        log.trace('Getting diff for users..')
-        users = await self.bot.api_client.get('users')
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
 
-        db_users = {
-            User(
-                guilds=tuple(user.pop('guilds')),
-                roles=tuple(user.pop('roles')),
-                **user
-            )
-            for user in users
+        # Rebuilt by `cache_records` and kept up to date by the member listeners
+        self.membership = MembershipIndex()
+
+        # The roles and guilds of the users in the database, for the member listeners
+        self.mirror = UserStateMirror()
+
+        # IDs of the guilds which weren't chunked when their members were last indexed
+        self.unchunked_guilds: t.Set[int] = set()
+
+    def observe(self, records: t.Iterable[User], replace: bool = False) -> None:
+        """Mirror the roles and guilds of `records`, which are in the database."""
+        if replace:
+            self.mirror.load({user.id: UserState(user.roles, user.guilds) for user in records})
+        else:
+            for user in records:
+                self.mirror.set(user.id, user.roles, user.guilds)
+
+    def record_adjuster(self) -> t.Optional[t.Callable[[User, User], User]]:
+        """
+        Return how to keep the memberships of users in the guilds which weren't chunked when indexed, if any.
+
+        The index lacks the roles and guilds of users in such guilds, e.g. while they're lazily
+        chunked after startup, so those are taken from the database instead of being removed.
+        """
+        if not self.unchunked_guilds:
+            return None
+
+        guild_ids = set(self.unchunked_guilds)
+        role_ids = {
+            role.id
+            for guild_id in guild_ids if (guild := self.bot.get_guild(guild_id)) is not None
+            for role in guild.roles
         }
-        db_user_ids = {user.id for user in db_users}
 
-        cache_users_dict = dict()
-        for guild in self.bot.guilds:
-            for user in guild.members:
-                if user.id in cache_users_dict.keys():
-                    user_dict = cache_users_dict[user.id]._asdict()
-                    roles = user_dict.pop('roles') + tuple(role.id for role in user.roles)
-                    cache_users_dict[user.id] = User(
-                        roles=tuple(sorted(roles)),
-                        **user_dict
-                    )
+        def adjust(user: User, db_user: User) -> User:
+            return user._replace(
+                roles=tuple(sorted({*user.roles, *(role for role in db_user.roles if role in role_ids)})),
+                guilds=tuple(sorted({*user.guilds, *(guild for guild in db_user.guilds if guild in guild_ids)}))
+            )
+
+        return adjust
+
+    def cache_records(self, scope: Scope = None) -> RecordStore:
+        """
+        Return the users in the cache by ID, with their roles and guilds across all guilds.
 
+        With a `scope`, only the members of those guilds are returned, still with all of their
+        roles and guilds. Only the memberships of those guilds are then rebuilt in the index.
+        The guilds which aren't chunked are noted, see `record_adjuster`.
+        """
+        guilds = self.cache_guilds(scope)
+
+        if scope is None:
+            self.membership.build(guilds)
+            self.unchunked_guilds = {guild.id for guild in guilds if not guild.chunked}
+        else:
+            for guild in guilds:
+                self.membership.add_guild(guild)
+
+                if guild.chunked:
+                    self.unchunked_guilds.discard(guild.id)
                 else:
-                    cache_users_dict[user.id] = User(
-                        id=user.id,
-                        name=user.name,
-                        discriminator=user.discriminator,
-                        created_at=str(user.created_at),
-                        avatar_url=str(user.avatar_url),
-                        roles=tuple(sorted(role.id for role in user.roles)),
-                        guilds=tuple(g.id for g in self.bot.guilds if g.get_member(user.id) is not None)
-                    )
+                    self.unchunked_guilds.add(guild.id)
 
-        cache_users = set(cache_users_dict.values())
-        cache_user_ids = set(cache_users_dict.keys())
+        return RecordStore(User, USER_COLUMNS, self._cache_users(guilds))
 
-        new_user_ids = cache_user_ids - db_user_ids
+    def _cache_users(self, guilds: t.Iterable[discord.Guild]) -> t.Iterator[tuple]:
+        """Yield the fields of each member of `guilds` once."""
+        seen = set()
+        for guild in guilds:
+            for user in guild.members:
+                if user.id in seen:
+                    continue
+                seen.add(user.id)
 
-        users_to_create = {user for user in cache_users if user.id in new_user_ids}
-        users_to_update = cache_users - db_users - users_to_create
+                yield (
+                    user.id,
+                    user.name,
+                    user.discriminator,
+                    str(user.created_at),
+                    str(user.avatar_url),
+                    self.membership.role_ids(user.id),
+                    self.membership.guild_ids(user.id)
+                )
 
-        return Diff(users_to_create, users_to_update, None)
+    def db_record(self, data: t.Dict) -> User:
+        return User(**{
+            **data,
+            'guilds': tuple(data['guilds']),
+            'roles': tuple(data['roles'])
+        })
 
     async def sync_diff(self, diff: Diff) -> None:
         """Synchronise the database with the users in the cache."""
-        log.trace('Syncing created users..')
-        for user in diff.created:
-            await self.bot.api_client.post('users', json=user._asdict())
-
-        log.trace('Syncing updated users..')
-        for user in diff.updated:
-            await self.bot.api_client.put(f'users/{user.id}', json=user._asdict())
+        log.trace('Syncing created and updated users..')
+        await gather_writes(
+            self.write('POST', 'users', diff.created),
+            self.write('PUT', 'users', diff.updated)
+        )